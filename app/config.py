@@ -1,8 +1,29 @@
 from functools import lru_cache
-from pydantic import BaseSettings, validator
-from typing import Optional
+from pydantic import BaseModel, BaseSettings, validator
+from typing import Dict, List, Literal, Optional
+import ipaddress
 import os
 
+class RateLimitTier(BaseModel):
+    """
+    Request limits of a client tier
+    """
+    per_minute: int  # Number of requests allowed per minute, sustained
+    burst: int  # Number of requests a client may send at once
+
+    @property
+    def interval(self) -> float:
+        """
+        Seconds between requests at the sustained rate
+        """
+        return 60 / self.per_minute
+
+    @validator('per_minute', 'burst')
+    def validate_limit(cls, v):
+        if v < 1:
+            raise ValueError("Rate limit must be positive")
+        return v
+
 class Settings(BaseSettings):
     """
     Application settings loaded from environment variables
@@ -14,14 +35,81 @@ class Settings(BaseSettings):
     # Cache Settings
     CACHE_TTL: int = 300  # Cache time-to-live in seconds
     CACHE_MAX_SIZE: int = 1000  # Maximum number of items in cache
+    CACHE_MAX_BYTES: Optional[int] = None  # Memory budget for cached responses in bytes, e.g. 268435456 (None disables)
+    CACHE_SOFT_TTL: Optional[int] = None  # Seconds before a cached response is served stale and refreshed in the background (None disables)
+    CACHE_MAX_REFRESHES: int = 4  # Maximum number of concurrent background refreshes
+    CACHE_BACKEND: Literal["memory", "sqlite", "shared"] = "memory"  # "sqlite" adds an on-disk tier that survives restarts, "shared" a response tier shared by all workers on a node
+    CACHE_SQLITE_PATH: str = "cache.sqlite3"  # Database file used by the sqlite cache backend
+    CACHE_SHARED_PATH: str = "/dev/shm/movie-search-cache"  # File memory-mapped by every worker for the shared cache backend
+    CACHE_SHARED_SLOTS: int = 1024  # Responses kept by the shared cache backend
+    CACHE_SHARED_SLOT_BYTES: int = 16384  # Size of one shared cache slot; larger compressed responses aren't shared
+    DETAIL_CACHE_TTL: int = 86400  # Time-to-live of per-movie detail records in seconds
+    DETAIL_CACHE_MAX_SIZE: int = 10000  # Maximum number of per-movie detail records
     
     # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 60  # Number of requests allowed per minute
-    RATE_LIMIT_BURST: int = 10  # Number of requests allowed in burst
+    RATE_LIMIT_PER_MINUTE: int = 60  # Number of requests allowed per minute, sustained
+    RATE_LIMIT_BURST: int = 10  # Number of requests a client may send at once
+    RATE_LIMIT_MAX_CLIENTS: int = 100000  # Clients tracked at most; the least recently seen are forgotten first
+    RATE_LIMIT_KEY: Literal["ip", "api_key", "api_key_and_ip"] = "ip"  # What a limit applies to; requests without a known API key are limited by IP
+    RATE_LIMIT_API_KEY_HEADER: str = "X-API-Key"  # Header carrying the client's API key
+    RATE_LIMIT_TIERS: Dict[str, RateLimitTier] = {}  # Limits per tier, e.g. {"partner": {"per_minute": 600, "burst": 50}}
+    RATE_LIMIT_API_KEYS: Dict[str, str] = {}  # API key: name of its tier in RATE_LIMIT_TIERS
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = []  # Addresses or networks of proxies whose X-Forwarded-For is trusted, e.g. ["10.0.0.0/8"]
+    RATE_LIMIT_SHARED_PATH: Optional[str] = None  # File memory-mapped by every worker on a node to enforce one limit across them, e.g. /dev/shm/movie-search-rate-limit (None keeps limits per worker)
     
     # API Timeouts
     API_TIMEOUT: int = 10  # Timeout for external API calls in seconds
+
+    # Outbound HTTP Connection Pool
+    HTTP_POOL_SIZE: int = 100  # Total number of simultaneous connections to providers
+    HTTP_POOL_SIZE_PER_HOST: int = 20  # Simultaneous connections per provider host
+    HTTP_KEEPALIVE_TIMEOUT: int = 30  # Seconds an idle connection is kept open for reuse
+    HTTP_DNS_CACHE_TTL: int = 300  # Seconds resolved provider addresses are cached
+
+    # Provider Pagination
+    PROVIDER_MAX_PAGES: int = 20  # Deepest upstream page fetched from each provider for one query
+    PROVIDER_SCAN_PAGES: int = 10  # Upstream pages a single request may fetch for streams filtered locally
+    PROVIDER_PREFETCH_PAGES: int = 3  # Pages fetched concurrently per provider when actor/genre filters are applied locally
+
+    # Provider Catalogs
+    GENRE_REFRESH_INTERVAL: int = 86400  # Seconds between reloads of the TMDB genre catalog
+
+    # Provider Detail Lookups
+    PROVIDER_DETAIL_CONCURRENCY: int = 5  # Concurrent per-movie detail calls per provider
+    PROVIDER_DETAIL_TIMEOUT: float = 3.0  # Timeout for a single detail call in seconds
+
+    # Outbound Provider Quotas
+    OMDB_CALLS_PER_SECOND: Optional[float] = None  # Outbound OMDB call rate (None disables)
+    TMDB_CALLS_PER_SECOND: Optional[float] = 40.0  # Outbound TMDB call rate (None disables)
+    OMDB_DAILY_QUOTA: Optional[int] = 1000  # OMDB calls per UTC day, e.g. 1000 on the free tier (None disables)
+    TMDB_DAILY_QUOTA: Optional[int] = None  # TMDB calls per UTC day (None disables)
+    QUOTA_LOW_WATERMARK: float = 0.1  # Share of a daily quota left at which calls are saved for returned rows
+    QUOTA_STATE_PATH: Optional[str] = "quota.json"  # File keeping daily call counts across restarts, merged by every worker on the node (None disables)
+    QUOTA_FLUSH_INTERVAL: int = 60  # Seconds between merges of the daily call counts
+
+    # Hedged Detail Calls
+    HEDGE_ENABLED: bool = False  # Duplicate detail calls that are slower than most recent ones
+    HEDGE_PERCENTILE: float = 95.0  # Latency percentile of recent detail calls after which a hedge is sent
+    HEDGE_MIN_SAMPLES: int = 20  # Detail calls recorded per provider before hedging starts
+    HEDGE_MAX_RATE: float = 0.05  # Maximum hedges per detail call, across all providers
+
+    # Provider Circuit Breakers
+    CIRCUIT_FAILURE_RATE: float = 0.5  # Share of failed or slow provider calls that opens the circuit
+    CIRCUIT_SLOW_CALL_DURATION: float = 5.0  # Provider calls slower than this many seconds count as failed
+    CIRCUIT_WINDOW_SIZE: int = 20  # Recent provider calls the failure rate is computed over
+    CIRCUIT_MIN_CALLS: int = 5  # Calls needed in the window before the circuit can open
+    CIRCUIT_RESET_TIMEOUT: float = 30.0  # Seconds an open circuit fails fast before probing the provider
+    CIRCUIT_HALF_OPEN_CALLS: int = 2  # Probe calls that must succeed to close the circuit again
+
+    # Result Ranking
+    RANK_WINDOW: int = 50  # Matching results ranked when a sort order is requested (at least page * limit, only that while a quota is low)
+
+    # Cross-provider De-duplication
+    DEDUP_TITLE_SIMILARITY: float = 0.9  # Minimum title similarity (0-1) to merge movies lacking a shared IMDb id
     
+    # Logging
+    LOG_QUEUE_SIZE: int = 10000  # Log records buffered for the writer thread; INFO records are dropped beyond it
+
     # Pagination Defaults
     DEFAULT_PAGE_SIZE: int = 10
     MAX_PAGE_SIZE: int = 50
@@ -38,18 +126,188 @@ class Settings(BaseSettings):
             raise ValueError("Cache max size must be positive")
         return v
 
-    @validator('RATE_LIMIT_PER_MINUTE')
+    @validator('CACHE_MAX_BYTES')
+    def validate_cache_max_bytes(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("Cache max bytes must be positive")
+        return v
+
+    @validator('CACHE_SOFT_TTL')
+    def validate_cache_soft_ttl(cls, v, values):
+        if v is not None:
+            if v < 0:
+                raise ValueError("Cache soft TTL must be non-negative")
+            if 'CACHE_TTL' in values and v > values['CACHE_TTL']:
+                raise ValueError("Cache soft TTL must not exceed CACHE_TTL")
+        return v
+
+    @validator('CACHE_MAX_REFRESHES')
+    def validate_cache_max_refreshes(cls, v):
+        if v < 1:
+            raise ValueError("Cache max refreshes must be positive")
+        return v
+
+    @validator('CACHE_SHARED_SLOTS')
+    def validate_cache_shared_slots(cls, v):
+        if v < 1:
+            raise ValueError("Shared cache slots must be positive")
+        return v
+
+    @validator('CACHE_SHARED_SLOT_BYTES')
+    def validate_cache_shared_slot_bytes(cls, v):
+        if v < 1024:
+            raise ValueError("Shared cache slot bytes must be at least 1024")
+        return v
+
+    @validator('DETAIL_CACHE_TTL')
+    def validate_detail_cache_ttl(cls, v):
+        if v < 0:
+            raise ValueError("Detail cache TTL must be non-negative")
+        return v
+
+    @validator('DETAIL_CACHE_MAX_SIZE')
+    def validate_detail_cache_max_size(cls, v):
+        if v < 1:
+            raise ValueError("Detail cache max size must be positive")
+        return v
+
+    @validator('RATE_LIMIT_PER_MINUTE', 'RATE_LIMIT_BURST', 'RATE_LIMIT_MAX_CLIENTS')
     def validate_rate_limit(cls, v):
         if v < 1:
             raise ValueError("Rate limit must be positive")
         return v
 
+    @validator('RATE_LIMIT_API_KEYS')
+    def validate_rate_limit_api_keys(cls, v, values):
+        tiers = values.get('RATE_LIMIT_TIERS', {})
+        for tier in v.values():
+            if tier not in tiers:
+                raise ValueError(f"Unknown rate limit tier: {tier}")
+        return v
+
+    @validator('RATE_LIMIT_TRUSTED_PROXIES')
+    def validate_rate_limit_trusted_proxies(cls, v):
+        for proxy in v:
+            try:
+                ipaddress.ip_network(proxy, strict=False)
+            except ValueError:
+                raise ValueError(f"Trusted proxy must be an IP address or network: {proxy}")
+        return v
+
     @validator('API_TIMEOUT')
     def validate_timeout(cls, v):
         if v < 1:
             raise ValueError("API timeout must be positive")
         return v
 
+    @validator('HTTP_POOL_SIZE', 'HTTP_POOL_SIZE_PER_HOST')
+    def validate_pool_size(cls, v):
+        if v < 1:
+            raise ValueError("Connection pool size must be positive")
+        return v
+
+    @validator('PROVIDER_MAX_PAGES', 'PROVIDER_SCAN_PAGES', 'PROVIDER_PREFETCH_PAGES')
+    def validate_provider_max_pages(cls, v):
+        if v < 1:
+            raise ValueError("Provider page limits must be positive")
+        return v
+
+    @validator('GENRE_REFRESH_INTERVAL')
+    def validate_genre_refresh_interval(cls, v):
+        if v < 1:
+            raise ValueError("Genre refresh interval must be positive")
+        return v
+
+    @validator('PROVIDER_DETAIL_CONCURRENCY')
+    def validate_detail_concurrency(cls, v):
+        if v < 1:
+            raise ValueError("Detail concurrency must be positive")
+        return v
+
+    @validator('PROVIDER_DETAIL_TIMEOUT')
+    def validate_detail_timeout(cls, v):
+        if v <= 0:
+            raise ValueError("Detail timeout must be positive")
+        return v
+
+    @validator('OMDB_CALLS_PER_SECOND', 'TMDB_CALLS_PER_SECOND', 'OMDB_DAILY_QUOTA', 'TMDB_DAILY_QUOTA')
+    def validate_provider_quota(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Provider quotas must be positive")
+        return v
+
+    @validator('QUOTA_LOW_WATERMARK')
+    def validate_quota_low_watermark(cls, v):
+        if not 0 <= v < 1:
+            raise ValueError("Quota low watermark must be between 0 and 1")
+        return v
+
+    @validator('QUOTA_FLUSH_INTERVAL')
+    def validate_quota_flush_interval(cls, v):
+        if v < 1:
+            raise ValueError("Quota flush interval must be positive")
+        return v
+
+    @validator('HEDGE_PERCENTILE')
+    def validate_hedge_percentile(cls, v):
+        if not 0 < v < 100:
+            raise ValueError("Hedge percentile must be between 0 and 100")
+        return v
+
+    @validator('HEDGE_MIN_SAMPLES')
+    def validate_hedge_min_samples(cls, v):
+        if v < 1:
+            raise ValueError("Hedge min samples must be positive")
+        return v
+
+    @validator('HEDGE_MAX_RATE')
+    def validate_hedge_max_rate(cls, v):
+        if not 0 <= v <= 1:
+            raise ValueError("Hedge max rate must be between 0 and 1")
+        return v
+
+    @validator('CIRCUIT_FAILURE_RATE')
+    def validate_circuit_failure_rate(cls, v):
+        if not 0 < v <= 1:
+            raise ValueError("Circuit failure rate must be between 0 and 1")
+        return v
+
+    @validator('CIRCUIT_SLOW_CALL_DURATION', 'CIRCUIT_RESET_TIMEOUT')
+    def validate_circuit_durations(cls, v):
+        if v <= 0:
+            raise ValueError("Circuit durations must be positive")
+        return v
+
+    @validator('CIRCUIT_WINDOW_SIZE', 'CIRCUIT_MIN_CALLS', 'CIRCUIT_HALF_OPEN_CALLS')
+    def validate_circuit_calls(cls, v):
+        if v < 1:
+            raise ValueError("Circuit call counts must be positive")
+        return v
+
+    @validator('RANK_WINDOW')
+    def validate_rank_window(cls, v):
+        if v < 1:
+            raise ValueError("Rank window must be positive")
+        return v
+
+    @validator('DEDUP_TITLE_SIMILARITY')
+    def validate_dedup_title_similarity(cls, v):
+        if not 0 < v <= 1:
+            raise ValueError("Title similarity must be between 0 and 1")
+        return v
+
+    @validator('LOG_QUEUE_SIZE')
+    def validate_log_queue_size(cls, v):
+        if v < 1:
+            raise ValueError("Log queue size must be positive")
+        return v
+
+    @validator('HTTP_KEEPALIVE_TIMEOUT', 'HTTP_DNS_CACHE_TTL')
+    def validate_connection_ttl(cls, v):
+        if v < 0:
+            raise ValueError("Connection timeouts must be non-negative")
+        return v
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,20 +1,43 @@
-from fastapi import FastAPI, HTTPException, Query, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from typing import Optional, List
 from .services.movie_service import MovieService
+from .services.ranking import SortOrder
 from .models.movie import MovieResponse, ErrorResponse
 from .config import get_settings
 from .middleware.rate_limit import rate_limit_middleware
 from .middleware.logging import logging_middleware
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the process-wide MovieService on startup and close it on shutdown
+    """
+    movie_service = MovieService()
+    await movie_service.start()
+    app.state.movie_service = movie_service
+    try:
+        yield
+    finally:
+        await movie_service.close()
+
+def get_movie_service(request: Request) -> MovieService:
+    """
+    Dependency returning the application-scoped MovieService
+    """
+    return request.app.state.movie_service
+
 app = FastAPI(
     title="Movie Search API",
     description="A RESTful API for searching movies across multiple providers",
     version="1.0.0",
     docs_url="/api/v1/docs",
     redoc_url="/api/v1/redoc",
-    openapi_url="/api/v1/openapi.json"
+    openapi_url="/api/v1/openapi.json",
+    lifespan=lifespan,
 )
 
 # Add middlewares
@@ -40,6 +63,16 @@ async def http_exception_handler(request, exc):
         content={"detail": exc.detail},
     )
 
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request, exc):
+    """
+    Report invalid query parameters as 400 Bad Request
+    """
+    return JSONResponse(
+        status_code=400,
+        content={"detail": str(exc)},
+    )
+
 @app.get("/api/v1/movies/search", 
          response_model=MovieResponse, 
          responses={
@@ -55,7 +88,9 @@ async def search_movies(
     genre: Optional[str] = Query(None, description="Movie genre"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=50, description="Results per page"),
-    movie_service: MovieService = Depends(MovieService),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor; overrides page"),
+    sort: Optional[SortOrder] = Query(None, description="Order results by relevance, year or title instead of provider order"),
+    movie_service: MovieService = Depends(get_movie_service),
 ):
     """
     Search for movies across multiple providers with various filters.
@@ -66,6 +101,8 @@ async def search_movies(
     - **genre**: Optional movie genre
     - **page**: Page number (starts from 1)
     - **limit**: Number of results per page (1-50)
+    - **cursor**: Optional cursor returned as next_cursor by a previous search with the same filters
+    - **sort**: Optional ordering: relevance, year (newest first) or title; can't be combined with cursor
     
     Returns paginated results combining data from all configured providers.
     At least one search parameter (title, actors, type, or genre) must be provided.
@@ -87,29 +124,44 @@ async def search_movies(
             type=type.lower() if type else None,
             genre=genre,
             page=page,
-            limit=limit
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
         )
         return results
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
+@app.get("/api/v1/metrics",
+         tags=["System"])
+async def metrics(movie_service: MovieService = Depends(get_movie_service)):
+    """
+    Cache hit rate and request coalescing counters for this worker.
+    """
+    return movie_service.metrics()
+
 @app.get("/api/v1/health",
          tags=["System"])
-async def health_check():
+async def health_check(movie_service: MovieService = Depends(get_movie_service)):
     """
     Health check endpoint to verify the API is running.
-    Returns a simple status message.
+    Returns a simple status message with the circuit breaker state of each
+    provider; the status is degraded while any circuit isn't closed.
     """
     try:
         settings = get_settings()
+        circuits = movie_service.circuits()
         status = {
-            "status": "healthy",
+            "status": "healthy" if all(c["state"] == "closed" for c in circuits.values()) else "degraded",
             "providers": {
                 "omdb": bool(settings.OMDB_API_KEY),
                 "tmdb": bool(settings.TMDB_API_KEY)
-            }
+            },
+            "circuits": circuits,
         }
         return status
     except Exception:
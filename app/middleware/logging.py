@@ -1,46 +1,96 @@
 from fastapi import Request
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
+import queue
 import time
-import json
 from typing import Callable
 import sys
+from ..config import get_settings
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app.log')
-    ]
-)
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler over a bounded queue that never blocks the caller.
+
+    When the queue is full, records below WARNING are dropped, while a
+    WARNING or worse makes room by discarding the oldest queued record.
+    The number of dropped records is logged once the queue has room again.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so records are formatted on its thread instead
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if not self._put(record):
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            if not self._put(record):
+                self.dropped += 1
+                return
+
+        if self.dropped > self._reported:
+            report = logging.LogRecord(
+                record.name, logging.WARNING, __file__, 0,
+                "Dropped %d log records while the log queue was full", (self.dropped - self._reported,), None,
+            )
+            if self._put(report):
+                self._reported = self.dropped
+
+    def _put(self, record: logging.LogRecord) -> bool:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            return False
+        return True
+
+# Configure logging: requests only enqueue records, a background thread writes them
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(formatter)
+file_handler = logging.FileHandler('app.log')
+file_handler.setFormatter(formatter)
+log_queue: queue.Queue = queue.Queue(maxsize=get_settings().LOG_QUEUE_SIZE)
+queue_listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[DroppingQueueHandler(log_queue)])
+queue_listener.start()
+atexit.register(queue_listener.stop)  # Flush queued records on shutdown
 
 logger = logging.getLogger(__name__)
 
 async def logging_middleware(request: Request, call_next: Callable):
     start_time = time.time()
-    
+    # Skip building log arguments entirely when INFO is disabled
+    log_info = logger.isEnabledFor(logging.INFO)
+
     # Log request
-    logger.info(f"Request started: {request.method} {request.url}")
-    if request.query_params:
-        logger.info(f"Query params: {dict(request.query_params)}")
-    
+    if log_info:
+        logger.info("Request started: %s %s", request.method, request.url)
+        if request.query_params:
+            logger.info("Query params: %s", dict(request.query_params))
+
     try:
         response = await call_next(request)
-        
+
         # Log response
-        process_time = time.time() - start_time
-        logger.info(
-            f"Request completed: {request.method} {request.url} "
-            f"- Status: {response.status_code} "
-            f"- Processing Time: {process_time:.3f}s"
-        )
-        
+        if log_info:
+            logger.info(
+                "Request completed: %s %s - Status: %d - Processing Time: %.3fs",
+                request.method, request.url, response.status_code, time.time() - start_time,
+            )
+
         return response
     except Exception as e:
         # Log error
-        logger.error(
-            f"Request failed: {request.method} {request.url} "
-            f"- Error: {str(e)}"
-        )
-        raise 
\ No newline at end of file
+        logger.error("Request failed: %s %s - Error: %s", request.method, request.url, e)
+        raise
@@ -1,72 +1,234 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
+from collections import OrderedDict
+import ipaddress
+import math
+import struct
 import time
-from ..config import get_settings
-from typing import Dict, Tuple
-import asyncio
+from ..config import RateLimitTier, Settings, get_settings
+from ..services.shared_memory import DIGEST_SIZE, SharedTable
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+EVICT_BATCH = 16  # Expired clients evicted per request at most, bounding the work per request
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    remaining: int  # Requests the client may still send right away
+    reset: float  # Seconds until the client's full burst is available again
+    retry_after: float  # Seconds until the next request is allowed, 0 when allowed
+
+class SharedRateLimits:
+    """
+    Theoretical arrival times of clients kept in a SharedTable, so every
+    worker on a node enforces one limit per client.
+
+    A full bucket gives up the slot with the earliest arrival time, which
+    normally belongs to an idle client. Arrival times are on the monotonic
+    clock, which is the same for every process on a Linux node; the table
+    is cleared after a reboot restarts that clock.
+    """
+    SLOT = struct.Struct(f"<{DIGEST_SIZE}sd")  # Digest, theoretical arrival time
+
+    def __init__(self, path: str, max_clients: int):
+        self.table = SharedTable(path, max_clients, self.SLOT.size)
+
+    def update(
+        self,
+        key: str,
+        decide: Callable[[Optional[float]], Tuple[RateLimitDecision, Optional[float]]],
+    ) -> RateLimitDecision:
+        """
+        Decide on a request from the stored arrival time of ``key`` while its
+        bucket is locked, storing the new arrival time ``decide`` returns
+        """
+        digest = self.table.digest(key)
+        buf = self.table.buf
+        with self.table.locked(self.table.bucket_of(digest)) as offsets:
+            slot, previous = None, None
+            victim, victim_tat = None, math.inf
+            for offset in offsets:
+                slot_digest, tat = self.SLOT.unpack_from(buf, offset)
+                if slot_digest == digest:
+                    slot, previous = offset, tat
+                    break
+                if tat < victim_tat:
+                    victim, victim_tat = offset, tat
+
+            decision, tat = decide(previous)
+            if tat is not None:
+                self.SLOT.pack_into(buf, victim if slot is None else slot, digest, tat)
+        return decision
 
 class RateLimiter:
-    def __init__(self):
-        self.settings = get_settings()
-        self.requests: Dict[str, Tuple[int, float]] = {}  # IP: (count, start_time)
-        self._cleanup_task = None
-
-    async def cleanup(self):
-        while True:
-            current_time = time.time()
-            # Remove entries older than 1 minute
-            self.requests = {
-                ip: (count, start_time)
-                for ip, (count, start_time) in self.requests.items()
-                if current_time - start_time < 60
-            }
-            await asyncio.sleep(60)  # Run cleanup every minute
-
-    async def start_cleanup(self):
-        if self._cleanup_task is None:
-            self._cleanup_task = asyncio.create_task(self.cleanup())
-
-    async def stop_cleanup(self):
-        if self._cleanup_task is not None:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-            self._cleanup_task = None
-
-    async def check_rate_limit(self, request: Request):
-        client_ip = request.client.host
-        current_time = time.time()
-
-        # Start cleanup task if not running
-        await self.start_cleanup()
-
-        if client_ip in self.requests:
-            count, start_time = self.requests[client_ip]
-            # Reset if minute has passed
-            if current_time - start_time >= 60:
-                self.requests[client_ip] = (1, current_time)
-            else:
-                # Check rate limit
-                if count >= self.settings.RATE_LIMIT_PER_MINUTE:
-                    raise HTTPException(
-                        status_code=429,
-                        detail="Too many requests. Please try again later."
-                    )
-                self.requests[client_ip] = (count + 1, start_time)
-        else:
-            self.requests[client_ip] = (1, current_time)
+    """
+    Per-client rate limiter implementing the generic cell rate algorithm (GCRA).
+
+    A client may send RATE_LIMIT_BURST requests at once and
+    RATE_LIMIT_PER_MINUTE requests per minute sustained. The only state kept
+    per client is its theoretical arrival time: the moment its burst would
+    be fully available again.
+
+    Clients are kept in the order they were last allowed a request, and
+    every request evicts a few expired clients from the front, so stale
+    state is dropped incrementally instead of in periodic full sweeps. A
+    client can linger behind a more recent one for at most the time its
+    burst takes to refill. Beyond RATE_LIMIT_MAX_CLIENTS the least recently
+    seen client is forgotten, which only grants it a fresh burst.
+
+    With RATE_LIMIT_SHARED_PATH set the arrival times are kept in shared
+    memory instead, so all workers on a node count against the same limit.
+
+    Requests are keyed by client IP, by API key or by both (RATE_LIMIT_KEY).
+    Known API keys get the limits of their tier; everything else is keyed
+    by IP under the default limits, so made-up keys don't buy new bursts.
+    """
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+        # Client key: theoretical arrival time, least recently seen first
+        self.clients: "OrderedDict[str, float]" = OrderedDict()
+        self.shared: Optional[SharedRateLimits] = None
+        if self.settings.RATE_LIMIT_SHARED_PATH:
+            self.shared = SharedRateLimits(self.settings.RATE_LIMIT_SHARED_PATH, self.settings.RATE_LIMIT_MAX_CLIENTS)
+        self.default_tier = RateLimitTier(
+            per_minute=self.settings.RATE_LIMIT_PER_MINUTE, burst=self.settings.RATE_LIMIT_BURST
+        )
+        # API key: its tier, resolved once so a request costs a single dict lookup
+        self.api_keys: Dict[str, RateLimitTier] = {
+            api_key: self.settings.RATE_LIMIT_TIERS[tier] for api_key, tier in self.settings.RATE_LIMIT_API_KEYS.items()
+        }
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy, strict=False) for proxy in self.settings.RATE_LIMIT_TRUSTED_PROXIES
+        ]
+
+    def _evict(self, now: float):
+        """
+        Drop up to EVICT_BATCH clients from the front whose burst is fully available again
+        """
+        clients = self.clients
+        for _ in range(EVICT_BATCH):
+            if not clients or clients[next(iter(clients))] > now:
+                return
+            clients.popitem(last=False)
+
+    def acquire(self, key: str, now: float, tier: Optional[RateLimitTier] = None) -> RateLimitDecision:
+        """
+        Count one request from ``key`` at ``now`` unless it exceeds the
+        limit of its tier, the default limits without one
+        """
+        tier = tier or self.default_tier
+        if self.shared is not None:
+            return self.shared.update(key, lambda previous: self._decide(previous, now, tier))
+
+        self._evict(now)
+        decision, tat = self._decide(self.clients.get(key), now, tier)
+        if tat is not None:
+            self.clients[key] = tat
+            self.clients.move_to_end(key)
+            if len(self.clients) > self.settings.RATE_LIMIT_MAX_CLIENTS:
+                self.clients.popitem(last=False)
+        return decision
+
+    def _decide(
+        self, previous: Optional[float], now: float, tier: RateLimitTier
+    ) -> Tuple[RateLimitDecision, Optional[float]]:
+        """
+        Decide on a request given the client's stored theoretical arrival
+        time, returning the new one to store if the request is allowed
+        """
+        interval = tier.interval
+        burst = tier.burst
+        tat = max(now if previous is None else previous, now) + interval
+        allow_at = tat - burst * interval
+
+        if now < allow_at:
+            return RateLimitDecision(False, 0, tat - interval - now, allow_at - now), None
+
+        remaining = int((now - allow_at) / interval + 1e-9)
+        return RateLimitDecision(True, remaining, tat - now, 0.0), tat
+
+    def headers(self, decision: RateLimitDecision, tier: Optional[RateLimitTier] = None) -> Dict[str, str]:
+        """
+        RateLimit-* response headers describing a decision, with Retry-After when rejected
+        """
+        tier = tier or self.default_tier
+        headers = {
+            "RateLimit-Limit": str(tier.burst),
+            "RateLimit-Remaining": str(decision.remaining),
+            "RateLimit-Reset": str(math.ceil(decision.reset)),
+            "RateLimit-Policy": f"{tier.burst};w={math.ceil(tier.burst * tier.interval)}",
+        }
+        if not decision.allowed:
+            headers["Retry-After"] = str(math.ceil(decision.retry_after))
+        return headers
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, request: Request) -> str:
+        """
+        Address of the client that sent a request.
+
+        Behind trusted proxies X-Forwarded-For is read right to left and the
+        first address that isn't a trusted proxy is the client; addresses
+        further left come from the client itself and could be forged.
+        """
+        peer = request.client.host if request.client else "unknown"
+        if not self.trusted_proxies or not self._trusted(peer):
+            return peer
+
+        forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+    def identify(self, request: Request) -> Tuple[str, RateLimitTier]:
+        """
+        Rate limit key and tier of a request, per RATE_LIMIT_KEY
+        """
+        client_ip = self.client_ip(request)
+        if self.settings.RATE_LIMIT_KEY != "ip":
+            api_key = request.headers.get(self.settings.RATE_LIMIT_API_KEY_HEADER)
+            tier = self.api_keys.get(api_key) if api_key else None
+            if tier is not None:
+                if self.settings.RATE_LIMIT_KEY == "api_key":
+                    return f"key:{api_key}", tier
+                return f"key:{api_key}:{client_ip}", tier
+        return client_ip, self.default_tier
+
+    async def check_rate_limit(self, request: Request) -> Dict[str, str]:
+        """
+        Count the request against its client's limit and return the rate limit headers.
+
+        Raises a 429 HTTPException carrying the headers when the limit is exceeded.
+        """
+        key, tier = self.identify(request)
+        decision = self.acquire(key, time.monotonic(), tier)
+        headers = self.headers(decision, tier)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please try again later.",
+                headers=headers,
+            )
+        return headers
 
 rate_limiter = RateLimiter()
 
 async def rate_limit_middleware(request: Request, call_next):
     try:
-        await rate_limiter.check_rate_limit(request)
+        headers = await rate_limiter.check_rate_limit(request)
         response = await call_next(request)
+        response.headers.update(headers)
         return response
     except HTTPException as exc:
         return JSONResponse(
             status_code=exc.status_code,
-            content={"detail": exc.detail}
-        ) 
\ No newline at end of file
+            content={"detail": exc.detail},
+            headers=exc.headers,
+        )
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, HttpUrl, validator
-from typing import List, Optional, Literal
+from pydantic import BaseModel, Field, HttpUrl, validator
+from typing import Dict, List, Optional, Literal, Tuple
 from datetime import datetime
+import json
+import time
 
 class Movie(BaseModel):
     """
@@ -14,6 +16,8 @@ class Movie(BaseModel):
     actors: List[str]
     genre: List[str]
     source: Literal["omdb", "tmdb"]  # Indicates which API provided this result
+    sources: List[Literal["omdb", "tmdb"]] = []  # Every API that returned this movie, defaults to [source]
+    popularity: Optional[float] = None  # Provider popularity score, where available
 
     @validator('year')
     def validate_year(cls, v):
@@ -39,14 +43,119 @@ class Movie(BaseModel):
             raise ValueError("At least one genre must be provided")
         return v
 
+    @validator('sources', always=True)
+    def validate_sources(cls, v, values):
+        if not v and 'source' in values:
+            return [values['source']]
+        return v
+
+class MovieDetail(BaseModel):
+    """
+    Normalized per-movie detail record shared across queries
+    """
+    movie: Movie
+    cast: List[str]  # Full cast, used for actor filtering
+    imdb_id: Optional[str] = None  # Used to match the same movie across providers
+
+class SearchQuery(BaseModel):
+    """
+    Canonical form of a search, shared by the cache key and request coalescing.
+
+    Text is case-folded with whitespace trimmed and collapsed; actors are
+    sorted and deduplicated so equivalent queries compare equal.
+    """
+    title: Optional[str] = None
+    actors: Tuple[str, ...] = ()
+    type: Optional[str] = None
+    genre: Optional[str] = None
+
+    @staticmethod
+    def _normalize_text(value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return " ".join(value.split()).casefold() or None
+
+    @classmethod
+    def normalize(
+        cls,
+        title: Optional[str] = None,
+        actors: Optional[List[str]] = None,
+        type: Optional[str] = None,
+        genre: Optional[str] = None,
+    ) -> "SearchQuery":
+        normalized_actors = {cls._normalize_text(actor) for actor in actors or []}
+        return cls(
+            title=cls._normalize_text(title),
+            actors=tuple(sorted(actor for actor in normalized_actors if actor)),
+            type=cls._normalize_text(type),
+            genre=cls._normalize_text(genre),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return not any([self.title, self.actors, self.type, self.genre])
+
+    @property
+    def key(self) -> str:
+        return json.dumps([self.title, list(self.actors), self.type, self.genre], separators=(",", ":"))
+
+ProviderStatus = Literal["ok", "timed_out", "failed", "circuit_open", "quota_exhausted"]
+
+class MovieHit(BaseModel):
+    """
+    A provider search hit, enriched into a Movie through a detail lookup
+    """
+    id: str  # imdbID for OMDB, movie id for TMDB
+    title: Optional[str] = None
+    year: Optional[str] = None
+    popularity: Optional[float] = None
+
+class ProviderPage(BaseModel):
+    """
+    One page of search hits from a single provider
+    """
+    hits: List[MovieHit] = []
+    next_page: Optional[int] = None  # None once the provider has no more pages
+    needs_filter: bool = False  # Hits still have to be matched against the actor/genre filters once enriched
+
+class ResultSet(BaseModel):
+    """
+    Provider pages fetched so far for a query
+    """
+    pages: Dict[str, Dict[int, ProviderPage]] = {}  # Provider name -> page number -> page
+    providers: Dict[str, ProviderStatus] = {}  # Outcome of the latest fetch from each provider
+    created_at: float = Field(default_factory=time.time)  # When the result set was started
+
+    @property
+    def complete(self) -> bool:
+        return all(status == "ok" for status in self.providers.values())
+
+    def unfiltered_after(self, positions: Dict[str, Optional[Tuple[int, int]]]) -> int:
+        """
+        Hits held past the given (page, offset) stream positions on pages
+        that need no local filtering, and so all match
+        """
+        count = 0
+        for name, position in positions.items():
+            if position is None:
+                continue
+            page_number, offset = position
+            for number, page in self.pages.get(name, {}).items():
+                if number >= page_number and not page.needs_filter:
+                    count += len(page.hits) - (offset if number == page_number else 0)
+        return count
+
 class MovieResponse(BaseModel):
     """
     Response model for movie search results
     """
     results: List[Movie]
-    total: int
+    total: int  # Matches counted so far, a lower bound while more provider pages remain
     page: int
     limit: int
+    providers: Dict[str, ProviderStatus] = {}  # Outcome of each provider queried for this response
+    next_cursor: Optional[str] = None  # Pass as cursor to continue after these results
+    exhaustive: bool = True  # False when more results may exist beyond what was scanned
 
     @validator('page')
     def validate_page(cls, v):
@@ -0,0 +1,359 @@
+from typing import Any, Callable, Generic, List, NamedTuple, Optional, Tuple, Type, TypeVar, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from .shared_memory import DIGEST_SIZE, SharedTable
+import asyncio
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+
+M = TypeVar("M", bound=BaseModel)
+
+class CacheEntry(NamedTuple):
+    """
+    A cached value with its wall-clock expiry timestamps
+    """
+    value: Any
+    stale_at: float  # After this the value is served stale and refreshed
+    expires_at: float  # After this the value is no longer served
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    @property
+    def stale(self) -> bool:
+        return time.time() >= self.stale_at
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory footprint of a value in bytes.
+
+    Like ``sys.getsizeof`` but follows containers, pydantic models and object
+    attributes, counting each object once.
+    """
+    seen = set()
+    size = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return size
+
+class CacheBackend:
+    """
+    Interface implemented by all cache backends
+    """
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CacheEntry):
+        raise NotImplementedError
+
+    async def warm(self):
+        """
+        Preload hot entries, called once on startup
+        """
+
+    async def close(self):
+        pass
+
+class MemoryCache(CacheBackend):
+    """
+    In-memory LRU cache bounded by number of entries and, optionally, by
+    the estimated size of the cached values in bytes
+    """
+    def __init__(
+        self,
+        maxsize: int,
+        max_bytes: Optional[int] = None,
+        weigher: Callable[[Any], int] = estimate_size,
+    ):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.weigher = weigher
+        self.currbytes = 0
+        self._entries: "OrderedDict[str, Tuple[CacheEntry, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pop(self, key: str):
+        _, weight = self._entries.pop(key)
+        self.currbytes -= weight
+
+    def get_nowait(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        entry = item[0]
+        if entry.expired:
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set_nowait(self, key: str, entry: CacheEntry):
+        if key in self._entries:
+            self._pop(key)
+
+        weight = self.weigher(entry.value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and weight > self.max_bytes:
+            # Never let a single oversized value flush the whole cache
+            return
+
+        self._entries[key] = (entry, weight)
+        self.currbytes += weight
+        while len(self._entries) > self.maxsize or \
+                (self.max_bytes is not None and self.currbytes > self.max_bytes):
+            self._pop(next(iter(self._entries)))
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, entry: CacheEntry):
+        self.set_nowait(key, entry)
+
+class ModelCodec(Generic[M]):
+    """
+    Serialize a pydantic model (or None) as zlib-compressed JSON
+    """
+    def __init__(self, model: Type[M]):
+        self.model = model
+
+    def dumps(self, value: Optional[M]) -> bytes:
+        if value is None:
+            return b""
+        return zlib.compress(value.json().encode())
+
+    def loads(self, data: bytes) -> Optional[M]:
+        if not data:
+            return None
+        return self.model.parse_raw(zlib.decompress(data))
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk cache stored in a SQLite table in WAL mode.
+
+    All database access runs on a dedicated thread so disk latency never
+    blocks the event loop.
+    """
+    def __init__(self, path: str, table: str, codec: ModelCodec):
+        self.path = path
+        self.table = table
+        self.codec = codec
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{table}")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "stale_at REAL NOT NULL, expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _get(self, key: str) -> Optional[Tuple[bytes, float, float]]:
+        return self._connect().execute(
+            f"SELECT value, stale_at, expires_at FROM {self.table} WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+
+    def _set(self, key: str, data: bytes, stale_at: float, expires_at: float):
+        conn = self._connect()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, stale_at, expires_at, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, stale_at, expires_at, time.time()),
+        )
+        conn.commit()
+
+    def _recent(self, limit: int) -> List[Tuple[str, bytes, float, float]]:
+        return self._connect().execute(
+            f"SELECT key, value, stale_at, expires_at FROM {self.table} "
+            "WHERE expires_at > ? ORDER BY stored_at DESC LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        row = await self._run(self._get, key)
+        if row is None:
+            return None
+        data, stale_at, expires_at = row
+        return CacheEntry(self.codec.loads(data), stale_at, expires_at)
+
+    async def set(self, key: str, entry: CacheEntry):
+        await self._run(self._set, key, self.codec.dumps(entry.value), entry.stale_at, entry.expires_at)
+
+    async def recent(self, limit: int) -> List[Tuple[str, CacheEntry]]:
+        """
+        Return up to ``limit`` live entries, most recently stored first
+        """
+        rows = await self._run(self._recent, limit)
+        return [
+            (key, CacheEntry(self.codec.loads(data), stale_at, expires_at))
+            for key, data, stale_at, expires_at in rows
+        ]
+
+    async def close(self):
+        def close_connection():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await self._run(close_connection)
+        self._executor.shutdown(wait=True)
+
+class SharedCache(CacheBackend):
+    """
+    Cache of hot entries in a SharedTable, so every worker on a node sees
+    the values any of them stored.
+
+    Each slot holds one entry: its key, expiry timestamps and the encoded
+    value. A full bucket gives up the slot expiring soonest. Values that
+    don't fit in a slot are not shared.
+    """
+    SLOT = struct.Struct(f"<{DIGEST_SIZE}sdddHI")  # Digest, stale_at, expires_at, stored_at, key and value length
+
+    def __init__(self, path: str, slots: int, slot_size: int, codec: ModelCodec):
+        self.table = SharedTable(path, slots, slot_size)
+        self.codec = codec
+        self.capacity = slot_size - self.SLOT.size
+
+    def _read(self, offset: int) -> Tuple[bytes, str, CacheEntry]:
+        buf = self.table.buf
+        digest, stale_at, expires_at, _, key_length, length = self.SLOT.unpack_from(buf, offset)
+        start = offset + self.SLOT.size
+        key = buf[start:start + key_length].decode()
+        data = buf[start + key_length:start + key_length + length]
+        return digest, key, CacheEntry(data, stale_at, expires_at)
+
+    def get_nowait(self, key: str) -> Optional[CacheEntry]:
+        digest = self.table.digest(key)
+        with self.table.locked(self.table.bucket_of(digest)) as offsets:
+            for offset in offsets:
+                if self.table.buf[offset:offset + DIGEST_SIZE] != digest:
+                    continue
+                _, slot_key, entry = self._read(offset)
+                if slot_key != key or entry.expired:
+                    return None
+                break
+            else:
+                return None
+        return CacheEntry(self.codec.loads(entry.value), entry.stale_at, entry.expires_at)
+
+    def set_nowait(self, key: str, entry: CacheEntry):
+        encoded_key = key.encode()
+        data = self.codec.dumps(entry.value)
+        if len(encoded_key) + len(data) > self.capacity:
+            return
+
+        digest = self.table.digest(key)
+        buf = self.table.buf
+        with self.table.locked(self.table.bucket_of(digest)) as offsets:
+            victim, victim_expires_at = None, float("inf")
+            for offset in offsets:
+                slot_digest, _, expires_at, *_ = self.SLOT.unpack_from(buf, offset)
+                if slot_digest == digest:
+                    victim = offset
+                    break
+                if expires_at < victim_expires_at:
+                    victim, victim_expires_at = offset, expires_at
+
+            self.SLOT.pack_into(
+                buf, victim, digest, entry.stale_at, entry.expires_at, time.time(), len(encoded_key), len(data)
+            )
+            start = victim + self.SLOT.size
+            buf[start:start + len(encoded_key) + len(data)] = encoded_key + data
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, entry: CacheEntry):
+        self.set_nowait(key, entry)
+
+    async def recent(self, limit: int) -> List[Tuple[str, CacheEntry]]:
+        """
+        Return up to ``limit`` live entries, most recently stored first
+        """
+        empty = bytes(DIGEST_SIZE)
+        now = time.time()
+        found = []
+        for bucket in range(self.table.buckets):
+            with self.table.locked(bucket) as offsets:
+                for offset in offsets:
+                    stored_at = self.SLOT.unpack_from(self.table.buf, offset)[3]
+                    digest, key, entry = self._read(offset)
+                    if digest != empty and entry.expires_at > now:
+                        found.append((stored_at, key, entry))
+
+        found.sort(key=lambda item: item[0], reverse=True)
+        return [
+            (key, CacheEntry(self.codec.loads(entry.value), entry.stale_at, entry.expires_at))
+            for _, key, entry in found[:limit]
+        ]
+
+    async def close(self):
+        self.table.close()
+
+class TieredCache(CacheBackend):
+    """
+    In-memory L1 in front of a persistent or shared L2.
+
+    Writes go to both tiers; L1 misses are served from L2 and promoted back
+    into L1, and on startup L1 is warmed with the most recent L2 entries.
+    """
+    def __init__(self, l1: MemoryCache, l2: Union[SQLiteCache, SharedCache]):
+        self.l1 = l1
+        self.l2 = l2
+
+    def __len__(self) -> int:
+        return len(self.l1)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.l1.get_nowait(key)
+        if entry is not None:
+            return entry
+
+        entry = await self.l2.get(key)
+        if entry is not None:
+            self.l1.set_nowait(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry):
+        self.l1.set_nowait(key, entry)
+        await self.l2.set(key, entry)
+
+    async def warm(self):
+        # Insert oldest first so the most recent entries end up hottest in the LRU
+        for key, entry in reversed(await self.l2.recent(self.l1.maxsize)):
+            self.l1.set_nowait(key, entry)
+
+    async def close(self):
+        await self.l2.close()
@@ -0,0 +1,132 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Literal, Tuple, Type, TypeVar
+from collections import deque
+import asyncio
+import time
+
+T = TypeVar("T")
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose circuit is open
+    """
+
+class CircuitBreaker:
+    """
+    Fail fast on a provider that keeps failing or responding slowly.
+
+    While closed, the outcomes of the last ``window_size`` calls are kept
+    and the circuit opens once at least ``min_calls`` were made and the
+    share of failed calls reaches ``failure_rate``. Calls slower than
+    ``slow_call_duration`` count as failed, and so do calls cancelled at
+    the request deadline. While open, calls are rejected with
+    CircuitOpenError. After ``reset_timeout`` the circuit becomes half-open
+    and lets ``half_open_calls`` probes through: if they all succeed it
+    closes, and the first failed probe opens it again.
+
+    Exceptions listed in ``ignored`` say nothing about the provider's health
+    (e.g. a used-up call budget) and count neither way.
+    """
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call_duration: float = 5.0,
+        window_size: int = 20,
+        min_calls: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_calls: int = 2,
+        ignored: Tuple[Type[BaseException], ...] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.ignored = ignored
+        self.clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)  # True for failed calls
+        self._state: CircuitState = "closed"
+        self._opened_at = 0.0
+        self._probes = 0  # Probes in flight while half-open
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == "open" and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._probes = 0
+            self._probe_successes = 0
+        return self._state
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``fn`` through the breaker, raising CircuitOpenError if it is rejected
+        """
+        probe = self._admit()
+        start = self.clock()
+        try:
+            result = await fn()
+        except self.ignored:
+            if probe:
+                self._probes -= 1
+            raise
+        except (Exception, asyncio.CancelledError):
+            self._record(probe, failed=True)
+            raise
+        self._record(probe, failed=self.clock() - start >= self.slow_call_duration)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current state for health reporting
+        """
+        state = self.state
+        snapshot = {
+            "state": state,
+            "failure_rate": round(sum(self._outcomes) / len(self._outcomes), 3) if self._outcomes else 0.0,
+            "calls": len(self._outcomes),
+        }
+        if state == "open":
+            snapshot["retry_in"] = round(self._opened_at + self.reset_timeout - self.clock(), 1)
+        return snapshot
+
+    def _admit(self) -> bool:
+        """
+        Admit a call, returning whether it is a half-open probe
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and self._probes + self._probe_successes < self.half_open_calls:
+            self._probes += 1
+            return True
+        raise CircuitOpenError("circuit open")
+
+    def _record(self, probe: bool, failed: bool):
+        if probe:
+            self._probes -= 1
+            if self._state != "half_open":
+                return  # Another probe already decided
+            if failed:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = "closed"
+                    self._outcomes.clear()
+            return
+
+        # Calls admitted before the circuit opened don't count against it twice
+        if self._state != "closed":
+            return
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and \
+                sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def _open(self):
+        self._state = "open"
+        self._opened_at = self.clock()
+        self._outcomes.clear()
@@ -0,0 +1,96 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from difflib import SequenceMatcher
+from ..models.movie import Movie, MovieDetail
+import re
+import unicodedata
+
+_ARTICLES = ("the ", "a ", "an ")
+
+def normalize_title(title: str) -> str:
+    """
+    Fold a title for matching: accents, case, punctuation and a leading article are ignored
+    """
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(c for c in title if not unicodedata.combining(c)).casefold()
+    title = " ".join(re.sub(r"[^\w]+", " ", title).split())
+    for article in _ARTICLES:
+        if title.startswith(article):
+            return title[len(article):]
+    return title
+
+def _union(first: Iterable[str], second: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys([*first, *second]))
+
+class _Candidate:
+    __slots__ = ("movie", "imdb_ids", "title")
+
+    def __init__(self, movie: Movie, imdb_id: Optional[str], title: str):
+        self.movie = movie
+        self.imdb_ids = {imdb_id} if imdb_id else set()
+        self.title = title
+
+class MovieDeduplicator:
+    """
+    Merge movies returned by more than one provider into a single result.
+
+    Movies with the same IMDb id are always duplicates. Otherwise a movie is
+    compared against the candidates in its block, keyed by type, year and
+    the first word of the normalized title (adjacent years included, since
+    providers disagree on release years), and matches one from another
+    provider when the titles are at least ``similarity`` alike. Blocks stay
+    small, so deduplicating n movies takes close to linear time.
+    """
+    def __init__(self, similarity: float = 0.9):
+        self.similarity = similarity
+        self._by_imdb_id: Dict[str, _Candidate] = {}
+        self._blocks: Dict[Tuple[str, int, str], List[_Candidate]] = {}
+
+    def add(self, record: MovieDetail) -> Optional[Movie]:
+        """
+        Register a detail record and return its movie, or None when it was
+        merged into a movie added earlier.
+
+        The returned movie is a copy owned by the deduplicator; later
+        duplicates are merged into it.
+        """
+        title = normalize_title(record.movie.title)
+        candidate = self._find(record, title)
+        if candidate is not None:
+            self._merge(candidate, record)
+            return None
+
+        candidate = _Candidate(record.movie.copy(), record.imdb_id, title)
+        if record.imdb_id:
+            self._by_imdb_id[record.imdb_id] = candidate
+        self._blocks.setdefault(self._block(record.movie, title), []).append(candidate)
+        return candidate.movie
+
+    def _block(self, movie: Movie, title: str, year_offset: int = 0) -> Tuple[str, int, str]:
+        return (movie.type, int(movie.year) + year_offset, title.split(" ", 1)[0])
+
+    def _find(self, record: MovieDetail, title: str) -> Optional[_Candidate]:
+        if record.imdb_id and record.imdb_id in self._by_imdb_id:
+            return self._by_imdb_id[record.imdb_id]
+
+        for year_offset in (0, -1, 1):
+            for candidate in self._blocks.get(self._block(record.movie, title, year_offset), []):
+                if record.movie.source in candidate.movie.sources:
+                    continue  # A provider doesn't list the same movie twice
+                if record.imdb_id and candidate.imdb_ids:
+                    continue  # Both are identified and the ids differ
+                if SequenceMatcher(None, title, candidate.title).ratio() >= self.similarity:
+                    return candidate
+        return None
+
+    def _merge(self, candidate: _Candidate, record: MovieDetail):
+        movie, other = candidate.movie, record.movie
+        movie.poster = movie.poster or other.poster
+        movie.plot = movie.plot or other.plot
+        movie.popularity = movie.popularity or other.popularity
+        movie.actors = _union(movie.actors, other.actors)
+        movie.genre = _union(movie.genre, other.genre)
+        movie.sources = _union(movie.sources, other.sources)
+
+        if record.imdb_id and record.imdb_id not in candidate.imdb_ids:
+            candidate.imdb_ids.add(record.imdb_id)
+            self._by_imdb_id[record.imdb_id] = candidate
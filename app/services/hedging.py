@@ -0,0 +1,88 @@
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+from collections import deque
+import asyncio
+import math
+
+T = TypeVar("T")
+
+class LatencyTracker:
+    """
+    Rolling window of recent call latencies
+    """
+    def __init__(self, window_size: int = 500, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window_size)
+
+    def record(self, duration: float):
+        self._samples.append(duration)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Latency below which ``percentile`` percent of recent calls finished,
+        or None until ``min_samples`` calls were recorded
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(math.ceil(percentile / 100 * len(ordered)) - 1, len(ordered) - 1)
+        return ordered[max(index, 0)]
+
+class HedgeBudget:
+    """
+    Global cap on hedged calls.
+
+    Every hedgeable call earns ``rate`` tokens, up to ``burst``, and every
+    hedge spends one, so hedges never exceed ``rate`` times the calls made
+    plus the burst.
+    """
+    def __init__(self, rate: float, burst: float = 10):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = 0.0
+        self.sent = 0  # Hedges fired
+        self.won = 0  # Hedges that answered before the original call
+
+    def earn(self):
+        self.tokens = min(self.tokens + self.rate, self.burst)
+
+    def spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.sent += 1
+        return True
+
+async def hedge(fn: Callable[[], Awaitable[T]], delay: Optional[float], budget: HedgeBudget) -> T:
+    """
+    Call ``fn``; if it hasn't returned after ``delay`` seconds and the budget
+    allows, call it again and return whichever succeeds first, cancelling
+    the other. Without a delay ``fn`` is called once.
+    """
+    budget.earn()
+    first = asyncio.ensure_future(fn())
+    tasks = [first]
+    try:
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not budget.spend():
+            return await first
+
+        second = asyncio.ensure_future(fn())
+        tasks.append(second)
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        budget.won += 1
+                    return task.result()
+
+        # Both failed: mark the hedge's error as retrieved and raise the original one
+        second.exception()
+        return first.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -1,21 +1,189 @@
-from typing import List, Optional, Dict, Any
+from typing import Awaitable, Callable, Iterator, List, Optional, Dict, Any, Tuple, TypeVar
+from contextvars import ContextVar
+from itertools import islice
+import asyncio
+import time
 import aiohttp
-from cachetools import TTLCache
-from ..config import get_settings
-from ..models.movie import Movie, MovieResponse
+from ..config import Settings, get_settings
+from ..models.movie import Movie, MovieDetail, MovieHit, MovieResponse, ProviderPage, ResultSet, SearchQuery
+from .cache import CacheBackend, CacheEntry, MemoryCache, ModelCodec, SharedCache, SQLiteCache, TieredCache
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .dedup import MovieDeduplicator
+from .hedging import HedgeBudget, LatencyTracker, hedge
+from .pagination import Position, StreamMerger, decode_cursor, encode_cursor
+from .quota import ProviderQuota, QuotaExceededError, QuotaStore
+from .ranking import Candidate, SortOrder, ranked_candidates, top_movies
+from .singleflight import SingleFlight
 from fastapi import HTTPException
 
+T = TypeVar("T")
+
+# Providers whose next request in this call already has a rate token, see MovieService._rate_limited
+_prepaid: ContextVar[Optional[List[str]]] = ContextVar("prepaid", default=None)
+
+TMDB_PAGE_SIZE = 20  # Results per page of TMDB list endpoints
+
 class MovieService:
-    def __init__(self):
-        self.settings = get_settings()
-        self.cache = TTLCache(maxsize=100, ttl=self.settings.CACHE_TTL)
+    """
+    Application-scoped movie search service.
+
+    One instance is created per process (see the lifespan handler in
+    ``app.main``) so the response cache and the pooled provider session
+    are shared by every request.
+    """
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+        # Provider pages fetched per normalized query. Entries expire at CACHE_TTL
+        # and are served stale while being refreshed once they pass CACHE_SOFT_TTL.
+        self.cache = self._create_cache(
+            "results",
+            self.settings.CACHE_MAX_SIZE,
+            ModelCodec(ResultSet),
+            max_bytes=self.settings.CACHE_MAX_BYTES,
+            shared=True,
+        )
+        # Normalized per-movie records shared by every query, keyed by provider id
+        self.detail_cache = self._create_cache(
+            "details", self.settings.DETAIL_CACHE_MAX_SIZE, ModelCodec(MovieDetail)
+        )
+        # TMDB person ids and credit lists, kept in memory only
+        self.lookup_cache = MemoryCache(maxsize=self.settings.DETAIL_CACHE_MAX_SIZE)
+        # Lower-cased TMDB genre name -> id, loaded on startup and refreshed periodically
+        self.tmdb_genres: Dict[str, int] = {}
+        self._genre_task = None
         self.session = None
+        # In-flight searches and detail fetches, coalesced by cache key
+        self._searches = SingleFlight()
+        self._details = SingleFlight()
+        self._detail_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._refreshes = set()
+        # Provider searches and detail calls go through a circuit breaker per provider
+        self.breakers = {name: self._create_breaker() for name in ("omdb", "tmdb")}
+        # Recent upstream detail latencies per provider, and the global hedge budget
+        self.detail_latency = {
+            name: LatencyTracker(min_samples=self.settings.HEDGE_MIN_SAMPLES) for name in ("omdb", "tmdb")
+        }
+        self.hedges = HedgeBudget(self.settings.HEDGE_MAX_RATE)
+        # Outbound call budgets per provider; daily counts are shared by the workers and persisted across restarts
+        self.quotas = {
+            "omdb": ProviderQuota(
+                self.settings.OMDB_CALLS_PER_SECOND, self.settings.OMDB_DAILY_QUOTA, self.settings.QUOTA_LOW_WATERMARK
+            ),
+            "tmdb": ProviderQuota(
+                self.settings.TMDB_CALLS_PER_SECOND, self.settings.TMDB_DAILY_QUOTA, self.settings.QUOTA_LOW_WATERMARK
+            ),
+        }
+        self.quota_store = QuotaStore(self.settings.QUOTA_STATE_PATH) if self.settings.QUOTA_STATE_PATH else None
+        self._quota_task = None
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    def _create_cache(
+        self,
+        name: str,
+        maxsize: int,
+        codec: ModelCodec,
+        max_bytes: Optional[int] = None,
+        shared: bool = False,
+    ) -> CacheBackend:
+        """
+        Build a cache for the configured CACHE_BACKEND.
+
+        The shared backend only backs caches built with ``shared``; others stay in memory.
+        """
+        memory = MemoryCache(maxsize=maxsize, max_bytes=max_bytes)
+        if self.settings.CACHE_BACKEND == "sqlite":
+            return TieredCache(memory, SQLiteCache(self.settings.CACHE_SQLITE_PATH, name, codec))
+        if self.settings.CACHE_BACKEND == "shared" and shared:
+            return TieredCache(memory, SharedCache(
+                self.settings.CACHE_SHARED_PATH,
+                self.settings.CACHE_SHARED_SLOTS,
+                self.settings.CACHE_SHARED_SLOT_BYTES,
+                codec,
+            ))
+        return memory
+
+    def _create_breaker(self) -> CircuitBreaker:
+        return CircuitBreaker(
+            failure_rate=self.settings.CIRCUIT_FAILURE_RATE,
+            slow_call_duration=self.settings.CIRCUIT_SLOW_CALL_DURATION,
+            window_size=self.settings.CIRCUIT_WINDOW_SIZE,
+            min_calls=self.settings.CIRCUIT_MIN_CALLS,
+            reset_timeout=self.settings.CIRCUIT_RESET_TIMEOUT,
+            half_open_calls=self.settings.CIRCUIT_HALF_OPEN_CALLS,
+            # Calls refused by our own quota say nothing about the provider
+            ignored=(QuotaExceededError,),
+        )
+
+    def _create_connector(self) -> aiohttp.TCPConnector:
+        """
+        Build the pooled connector shared by all provider calls
+        """
+        return aiohttp.TCPConnector(
+            limit=self.settings.HTTP_POOL_SIZE,
+            limit_per_host=self.settings.HTTP_POOL_SIZE_PER_HOST,
+            keepalive_timeout=self.settings.HTTP_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=self.settings.HTTP_DNS_CACHE_TTL,
+        )
 
     async def get_session(self) -> aiohttp.ClientSession:
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+            self.session = aiohttp.ClientSession(
+                connector=self._create_connector(),
+                timeout=aiohttp.ClientTimeout(total=self.settings.API_TIMEOUT),
+            )
         return self.session
 
+    async def start(self):
+        """
+        Open the pooled provider session and warm the caches. Called once on application startup.
+        """
+        await self.get_session()
+        await self.cache.warm()
+        await self.detail_cache.warm()
+        if self.quota_store is not None and self._quota_task is None:
+            try:
+                self.quota_store.load(self.quotas)
+            except OSError as e:
+                print(f"Error loading provider quotas: {str(e)}")
+            self._quota_task = asyncio.ensure_future(self._flush_quotas())
+        if self.settings.TMDB_API_KEY and self._genre_task is None:
+            await self._try_load_tmdb_genres()
+            self._genre_task = asyncio.ensure_future(self._refresh_tmdb_genres())
+
+    async def close(self):
+        """
+        Close the provider session and its connection pool. Called once on application shutdown.
+        """
+        if self._genre_task is not None:
+            self._genre_task.cancel()
+            try:
+                await self._genre_task
+            except asyncio.CancelledError:
+                pass
+            self._genre_task = None
+
+        for task in list(self._refreshes):
+            task.cancel()
+        if self._refreshes:
+            await asyncio.gather(*self._refreshes, return_exceptions=True)
+
+        if self._quota_task is not None:
+            self._quota_task.cancel()
+            try:
+                await self._quota_task
+            except asyncio.CancelledError:
+                pass
+            self._quota_task = None
+            await self._save_quotas()
+
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+        await self.cache.close()
+        await self.detail_cache.close()
+
     async def search_movies(
         self,
         title: Optional[str] = None,
@@ -24,27 +192,25 @@ class MovieService:
         genre: Optional[str] = None,
         page: int = 1,
         limit: int = 10,
+        cursor: Optional[str] = None,
+        sort: Optional[SortOrder] = None,
     ) -> MovieResponse:
         """
-        Search for movies across multiple providers and combine results
+        Search for movies across multiple providers and combine results.
+
+        Provider result pages are merged hit by hit and enriched as the
+        README describes. ``cursor`` resumes a previous response; ``sort``
+        ranks a window of matches, paged with ``page`` only.
         """
+        query = SearchQuery.normalize(title, actors, type, genre)
+
         # Validate that at least one search parameter is provided
-        if not any([title, actors, type, genre]):
+        if query.is_empty:
             raise HTTPException(
                 status_code=400,
                 detail="At least one search parameter (title, actors, type, or genre) must be provided"
             )
 
-        cache_key = f"{title}:{','.join(actors or [])}:{type}:{genre}:{page}:{limit}"
-        
-        # Check cache first
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
-        # Gather results from both providers
-        results = []
-        total = 0
-
         # Validate API keys
         if not self.settings.OMDB_API_KEY and not self.settings.TMDB_API_KEY:
             raise HTTPException(
@@ -52,43 +218,531 @@ class MovieService:
                 detail="No movie API providers are configured"
             )
 
-        session = await self.get_session()
+        if cursor and sort is not None:
+            raise ValueError("cursor cannot be combined with sort")
+        if cursor:
+            positions = decode_cursor(cursor, query.key)
+            skip = 0
+        else:
+            positions = {name: (1, 0) for name in self._providers()}
+            skip = (page - 1) * limit
 
-        # Search OMDB
-        if self.settings.OMDB_API_KEY:
-            try:
-                omdb_results = await self._search_omdb(session, title, actors, type, genre, page)
-                results.extend(omdb_results)
-                total += len(omdb_results)
-            except Exception as e:
-                print(f"OMDB API error: {str(e)}")
-                # Continue with other providers if one fails
+        deadline = time.monotonic() + self.settings.API_TIMEOUT
+        merger = StreamMerger(
+            await self._get_result_set(query),
+            positions,
+            self._providers(),
+            lambda result_set, wanted: self._fetch_more(query, result_set, wanted, deadline),
+            self.settings.PROVIDER_MAX_PAGES,
+            # Don't read ahead on a provider quota that is running low
+            prefetch=1 if self._quota_low() else self.settings.PROVIDER_PREFETCH_PAGES,
+            budget=self.settings.PROVIDER_SCAN_PAGES,
+        )
+        if sort is None:
+            candidates, positions, matched = await self._collect(query, merger, positions, skip, limit, deadline)
+            movies = [movie for _, _, movie in candidates]
+        else:
+            # Only rank the requested page's matches while a quota is running low
+            window = skip + limit if self._quota_low() else max(skip + limit, self.settings.RANK_WINDOW)
+            if sort == "relevance":
+                candidates, positions, matched = await self._collect(query, merger, positions, 0, window, deadline)
+                movies = top_movies([movie for _, _, movie in candidates], query, sort, skip + limit)[skip:]
+            else:
+                dedup = MovieDeduplicator(self.settings.DEDUP_TITLE_SIMILARITY)
+                candidates, positions, matched = await self._collect(
+                    query, merger, positions, 0, window, deadline, dedup=dedup, enrich=False,
+                )
+                ranked = ranked_candidates(candidates, sort)
+                movies = await self._enrich_ranked(ranked, skip, limit, deadline, dedup)
+        next_cursor = encode_cursor(query.key, positions)
+
+        return MovieResponse(
+            results=movies,
+            # Matches counted so far, plus fetched hits past them that need no filtering
+            total=matched + merger.result_set.unfiltered_after(positions),
+            page=page,
+            limit=limit,
+            providers=merger.result_set.providers,
+            next_cursor=next_cursor if sort is None else None,
+            exhaustive=next_cursor is None and not merger.truncated,
+        )
+
+    def circuits(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Circuit breaker state of each configured provider
+        """
+        return {name: self.breakers[name].snapshot() for name in self._providers()}
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Cache, request coalescing, hedging and provider quota counters
+        """
+        lookups = sum(self.stats.values())
+        return {
+            "cache": {
+                **self.stats,
+                "hit_rate": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0,
+            },
+            "coalesced": {
+                "searches": self._searches.coalesced,
+                "details": self._details.coalesced,
+            },
+            "hedges": {
+                "sent": self.hedges.sent,
+                "won": self.hedges.won,
+            },
+            "quota": {name: self.quotas[name].snapshot() for name in self._providers()},
+        }
+
+    def _quota_low(self) -> bool:
+        return any(self.quotas[name].low for name in self._providers())
+
+    async def _flush_quotas(self):
+        """
+        Merge the daily call counts every QUOTA_FLUSH_INTERVAL seconds
+        """
+        while True:
+            await asyncio.sleep(self.settings.QUOTA_FLUSH_INTERVAL)
+            await self._save_quotas()
+
+    async def _save_quotas(self):
+        """
+        Add the calls made since the last save to the shared daily counts and adopt the totals
+        """
+        loop = asyncio.get_running_loop()
+        deltas = QuotaStore.deltas(self.quotas)
+        try:
+            totals = await loop.run_in_executor(None, self.quota_store.merge, deltas)
+        except OSError as e:
+            print(f"Error saving provider quotas: {str(e)}")
+            return
+        QuotaStore.apply(self.quotas, deltas, totals)
+
+    async def _get_result_set(self, query: SearchQuery) -> ResultSet:
+        """
+        Get the cached result set for a query, or an empty one on a miss
+        """
+        # Check cache first, serving stale entries while they are refreshed
+        entry = await self.cache.get(query.key)
+        if entry is not None:
+            if entry.stale:
+                self.stats["stale_hits"] += 1
+                self._schedule_refresh(query)
+            else:
+                self.stats["hits"] += 1
+            return entry.value
+
+        self.stats["misses"] += 1
+        return ResultSet()
+
+    def _schedule_refresh(self, query: SearchQuery):
+        """
+        Refresh a stale result set in the background by refetching the first page of every provider.
+
+        Skipped when the same fetch is already in flight, CACHE_MAX_REFRESHES
+        refreshes are running or a provider's daily quota is running low; the
+        stale entry keeps being served meanwhile.
+        """
+        first_pages = {name: [1] for name in self._providers()}
+        if self._fetch_key(query, first_pages) in self._searches or \
+                len(self._refreshes) >= self.settings.CACHE_MAX_REFRESHES or self._quota_low():
+            return
+
+        deadline = time.monotonic() + self.settings.API_TIMEOUT
+        task = asyncio.ensure_future(self._fetch_pages(query, ResultSet(), first_pages, deadline))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Future):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Cache refresh error: {str(task.exception())}")
 
-        # Search TMDB
+    def _providers(self) -> List[str]:
+        """
+        Names of the configured providers, in merge order
+        """
+        providers = []
+        if self.settings.OMDB_API_KEY:
+            providers.append("omdb")
         if self.settings.TMDB_API_KEY:
-            try:
-                tmdb_results = await self._search_tmdb(session, title, actors, type, genre, page)
-                results.extend(tmdb_results)
-                total += len(tmdb_results)
-            except Exception as e:
-                print(f"TMDB API error: {str(e)}")
-                # Continue with other providers if one fails
+            providers.append("tmdb")
+        return providers
 
-        # Apply pagination
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_results = results[start_idx:end_idx]
+    async def _fetch_more(
+        self,
+        query: SearchQuery,
+        result_set: ResultSet,
+        wanted: Dict[str, List[int]],
+        deadline: float,
+    ) -> ResultSet:
+        """
+        Fetch provider pages for the merge unless a provider already failed
+        for this request or the deadline has passed
+        """
+        if not result_set.complete or time.monotonic() >= deadline:
+            return result_set
+        return await self._fetch_pages(query, result_set, wanted, deadline)
 
-        response = MovieResponse(
-            results=paginated_results,
-            total=total,
-            page=page,
-            limit=limit
+    async def _collect(
+        self,
+        query: SearchQuery,
+        merger: StreamMerger,
+        positions: Dict[str, Position],
+        skip: int,
+        limit: int,
+        deadline: float,
+        dedup: Optional[MovieDeduplicator] = None,
+        enrich: bool = True,
+    ) -> Tuple[List[Candidate], Dict[str, Position], int]:
+        """
+        Pull hits from the merged provider streams until ``skip + limit``
+        matches are counted, returning the candidates after the first
+        ``skip``, the positions following them and the number of matches.
+
+        Filtered hits are enriched in batches until enough match, other hits
+        only inside the window (never without ``enrich``), and skipped hits
+        are checked against the detail cache. Past ``deadline`` only cached
+        details are used and collection stops at the first hit lacking them.
+        """
+        session = await self.get_session()
+        positions = dict(positions)
+        if dedup is None:
+            dedup = MovieDeduplicator(self.settings.DEDUP_TITLE_SIMILARITY)
+        events = merger.__aiter__()
+        wanted = skip + limit
+        matched = 0
+        candidates = []
+        exhausted = False
+        out_of_time = False
+
+        while matched < wanted and not exhausted and not out_of_time:
+            # Take as many hits as are still missing, assuming they all match
+            batch = []
+            hits = 0
+            while hits < wanted - matched:
+                try:
+                    event = await events.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                batch.append(event)
+                if event[1] is not None:
+                    hits += 1
+
+            # Enrich filtered hits, and unfiltered hits that may land in the window.
+            # Filtered hits only use cached details while the provider quota is low.
+            lookups = []
+            cached_lookups = []
+            skipped_lookups = []
+            index = matched
+            out_of_time = time.monotonic() >= deadline
+            for name, hit, _, needs_filter in batch:
+                if hit is None:
+                    continue
+                in_window = enrich and index >= skip
+                if out_of_time and (needs_filter or in_window):
+                    cached_lookups.append((name, hit))
+                elif needs_filter and self.quotas[name].low:
+                    cached_lookups.append((name, hit))
+                elif needs_filter or in_window:
+                    lookups.append((name, hit))
+                elif enrich:
+                    skipped_lookups.append((name, hit))
+                index += 1
+            records = await self._enrich(session, lookups, deadline)
+            records.update(await self._cached_records(cached_lookups))
+            looked_up = {(name, hit.id) for name, hit in lookups + cached_lookups}
+            # Earlier pages cached the details of the hits they showed or passed over
+            skipped = await self._cached_records(skipped_lookups)
+            records.update(skipped)
+            out_of_time = time.monotonic() >= deadline
+
+            for name, hit, position, needs_filter in batch:
+                if matched >= wanted:
+                    break
+                record = records.get((name, hit.id)) if hit is not None else None
+                if out_of_time and record is None and hit is not None and (name, hit.id) in looked_up:
+                    break  # Resume from this hit
+                positions[name] = position
+                if hit is None:
+                    continue
+                if record is None and ((name, hit.id) in looked_up or (name, hit.id) in skipped):
+                    continue  # Details failed or are invalid, so the hit can't be returned
+                if needs_filter and not self._matches(name, record, query):
+                    continue
+                movie = None
+                if record is not None:
+                    movie = dedup.add(record)
+                    if movie is None:
+                        continue  # Merged into a movie from another provider
+                matched += 1
+                if matched > skip:
+                    candidates.append((name, hit, movie))
+
+        return candidates, positions, matched
+
+    async def _enrich_ranked(
+        self,
+        ranked: Iterator[Candidate],
+        skip: int,
+        limit: int,
+        deadline: float,
+        dedup: MovieDeduplicator,
+    ) -> List[Movie]:
+        """
+        Pass over the ``skip`` ranked candidates earlier pages showed, then
+        enrich the next ones until ``limit`` movies survive failed lookups
+        and duplicates. Past ``deadline`` only cached details are used.
+        """
+        passed = 0
+        while passed < skip:
+            candidate = next(ranked, None)
+            if candidate is None:
+                return []
+            name, hit, movie = candidate
+            if movie is None:
+                records = await self._cached_records([(name, hit)])
+                if (name, hit.id) in records:
+                    record = records[(name, hit.id)]
+                    if record is None or dedup.add(record) is None:
+                        continue  # Earlier pages replaced it with the next candidate
+            passed += 1
+
+        session = await self.get_session()
+        movies = []
+        while len(movies) < limit:
+            batch = list(islice(ranked, limit - len(movies)))
+            if not batch:
+                break
+
+            lookups = [(name, hit) for name, hit, movie in batch if movie is None]
+            if time.monotonic() >= deadline:
+                records = await self._cached_records(lookups)
+            else:
+                records = await self._enrich(session, lookups, deadline)
+
+            for name, hit, movie in batch:
+                if movie is None:
+                    record = records.get((name, hit.id))
+                    if record is None:
+                        continue
+                    movie = dedup.add(record)
+                    if movie is None:
+                        continue  # Merged into a movie from another provider
+                movies.append(movie)
+        return movies
+
+    async def _enrich(
+        self,
+        session: aiohttp.ClientSession,
+        lookups: List[Tuple[str, MovieHit]],
+        deadline: Optional[float] = None,
+    ) -> Dict[Tuple[str, str], MovieDetail]:
+        """
+        Fetch the detail records of provider hits concurrently until ``deadline``, keyed by (provider, hit id)
+        """
+        fetchers = {"omdb": self._fetch_omdb_detail, "tmdb": self._fetch_tmdb_detail}
+        by_provider: Dict[str, List[MovieHit]] = {}
+        for name, hit in lookups:
+            by_provider.setdefault(name, []).append(hit)
+
+        names = list(by_provider)
+        results = await asyncio.gather(*(
+            self._fetch_details(
+                name, by_provider[name], lambda hit, fetch=fetchers[name]: fetch(session, hit.id), deadline
+            )
+            for name in names
+        ))
+
+        records = {}
+        for name, provider_records in zip(names, results):
+            for hit, record in zip(by_provider[name], provider_records):
+                if record is not None:
+                    records[(name, hit.id)] = record
+        return records
+
+    async def _cached_records(self, lookups: List[Tuple[str, MovieHit]]) -> Dict[Tuple[str, str], Optional[MovieDetail]]:
+        """
+        Detail records of provider hits already in the detail cache, keyed by
+        (provider, hit id); None for details cached as invalid
+        """
+        records = {}
+        for name, hit in lookups:
+            entry = await self.detail_cache.get(f"{name}:{hit.id}")
+            if entry is not None:
+                records[(name, hit.id)] = entry.value
+        return records
+
+    def _matches(self, provider: str, record: MovieDetail, query: SearchQuery) -> bool:
+        """
+        Check a detail record against the query's actor and genre filters.
+
+        Every searched actor must be in the cast, as with the intersected
+        TMDB actor searches.
+        """
+        if provider == "omdb":
+            # OMDB lists actors and genres as comma-separated strings
+            cast = ", ".join(record.cast).lower()
+            genres = ", ".join(record.movie.genre).lower()
+            return all(actor.lower() in cast for actor in query.actors) and \
+                (not query.genre or query.genre.lower() in genres)
+
+        return all(any(actor.lower() in name.lower() for name in record.cast) for actor in query.actors) and \
+            (not query.genre or any(g.lower() == query.genre.lower() for g in record.movie.genre))
+
+    def _fetch_key(self, query: SearchQuery, wanted: Dict[str, List[int]]) -> Tuple[str, Tuple[Tuple[str, Tuple[int, ...]], ...]]:
+        return (query.key, tuple(sorted((name, tuple(pages)) for name, pages in wanted.items())))
+
+    async def _fetch_pages(
+        self,
+        query: SearchQuery,
+        result_set: ResultSet,
+        wanted: Dict[str, List[int]],
+        deadline: float,
+    ) -> ResultSet:
+        """
+        Fetch the given pages of each provider, add them to the result set and cache it.
+
+        Identical fetches already in flight are shared.
+        """
+        return await self._searches.do(
+            self._fetch_key(query, wanted),
+            lambda: self._fetch_pages_upstream(query, result_set, wanted, deadline),
         )
 
-        # Cache the response
-        self.cache[cache_key] = response
-        return response
+    async def _fetch_pages_upstream(
+        self,
+        query: SearchQuery,
+        result_set: ResultSet,
+        wanted: Dict[str, List[int]],
+        deadline: float,
+    ) -> ResultSet:
+        title, type, genre = query.title, query.type, query.genre
+        actors = list(query.actors) or None
+
+        session = await self.get_session()
+
+        # Query the providers, and every page wanted from each, concurrently
+        searches = {}
+        for name, provider_pages in wanted.items():
+            search = {"omdb": self._search_omdb, "tmdb": self._search_tmdb}.get(name)
+            if search is None:
+                continue
+            for page in provider_pages:
+                searches[(name, page)] = self._upstream_search(
+                    name, lambda search=search, page=page: search(session, title, actors, type, genre, page)
+                )
+
+        fetched, statuses = await self._gather_providers(searches, deadline)
+
+        pages = {name: dict(stream) for name, stream in result_set.pages.items()}
+        for (name, page), provider_page in fetched.items():
+            pages.setdefault(name, {})[page] = provider_page
+
+        extended = ResultSet(
+            pages=pages,
+            providers={**result_set.providers, **statuses},
+            created_at=result_set.created_at,
+        )
+
+        # Only cache complete fetches so a degraded provider is retried next time
+        if all(status == "ok" for status in statuses.values()):
+            soft_ttl = self.settings.CACHE_SOFT_TTL
+            if soft_ttl is None:
+                soft_ttl = self.settings.CACHE_TTL
+            await self.cache.set(query.key, CacheEntry(
+                extended,
+                extended.created_at + soft_ttl,
+                extended.created_at + self.settings.CACHE_TTL,
+            ))
+        return extended
+
+    async def _gather_providers(
+        self,
+        searches: Dict[Tuple[str, int], Awaitable[ProviderPage]],
+        deadline: float,
+    ) -> Tuple[Dict[Tuple[str, int], ProviderPage], Dict[str, str]]:
+        """
+        Run provider searches, keyed by (provider, page), concurrently until the request deadline.
+
+        Returns every page that finished in time along with a status per
+        provider: ok, timed_out, failed, circuit_open or quota_exhausted. A
+        provider is only ok when all of its pages are.
+        """
+        if not searches:
+            return {}, {}
+
+        tasks = {key: asyncio.ensure_future(search) for key, search in searches.items()}
+        try:
+            done, pending = await asyncio.wait(tasks.values(), timeout=max(deadline - time.monotonic(), 0))
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        results = {}
+        statuses = {}
+        for (name, page), task in tasks.items():
+            if task not in done:
+                print(f"{name.upper()} API timed out after {self.settings.API_TIMEOUT}s")
+                status = "timed_out"
+            elif isinstance(task.exception(), CircuitOpenError):
+                status = "circuit_open"
+            elif isinstance(task.exception(), QuotaExceededError):
+                status = "quota_exhausted"
+            elif task.exception() is not None:
+                print(f"{name.upper()} API error: {str(task.exception())}")
+                status = "failed"
+            else:
+                results[(name, page)] = task.result()
+                status = "ok"
+            if statuses.get(name, "ok") == "ok":
+                statuses[name] = status
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return results, statuses
+
+    def _detail_semaphore(self, provider: str) -> asyncio.Semaphore:
+        """
+        Get the semaphore bounding concurrent upstream detail calls to a provider
+        """
+        if provider not in self._detail_semaphores:
+            self._detail_semaphores[provider] = asyncio.Semaphore(self.settings.PROVIDER_DETAIL_CONCURRENCY)
+        return self._detail_semaphores[provider]
+
+    async def _fetch_details(
+        self,
+        provider: str,
+        items: List[Any],
+        fetch: Callable[[Any], Awaitable[Optional[MovieDetail]]],
+        deadline: Optional[float] = None,
+    ) -> List[Optional[MovieDetail]]:
+        """
+        Run per-movie detail lookups concurrently; their upstream calls
+        are bounded by PROVIDER_DETAIL_CONCURRENCY per provider.
+
+        Results keep the order of ``items``. Lookups that fail, exceed
+        PROVIDER_DETAIL_TIMEOUT or are still running at ``deadline`` are
+        None without affecting the others.
+        """
+        async def run(item):
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    return None
+            try:
+                return await asyncio.wait_for(fetch(item), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"{provider.upper()} movie details timed out")
+            except (CircuitOpenError, QuotaExceededError):
+                pass
+            except Exception as e:
+                print(f"Error fetching {provider.upper()} movie details: {str(e)}")
+            return None
+
+        return await asyncio.gather(*(run(item) for item in items))
 
     async def _search_omdb(
         self,
@@ -98,61 +752,233 @@ class MovieService:
         type: Optional[str],
         genre: Optional[str],
         page: int,
-    ) -> List[Movie]:
+    ) -> ProviderPage:
         """
         Search movies using the OMDB API
         """
+        # OMDB can only search by title; anything else would be a charged, empty call
+        if not title:
+            return ProviderPage()
+
         params = {
             "apikey": self.settings.OMDB_API_KEY,
             "page": page,
+            "s": title,
         }
-
-        # Add search parameters if provided
-        if title:
-            params["s"] = title
         if type:
             params["type"] = type
 
+        data = await self._get_json(session, "omdb", "http://www.omdbapi.com/", params)
+
+        if data.get("Response") == "False":
+            return ProviderPage()
+
+        # OMDB returns 10 results per page
+        has_more = page * 10 < int(data.get("totalResults", 0))
+        return ProviderPage(
+            hits=[
+                MovieHit(id=item["imdbID"], title=item.get("Title"), year=item.get("Year"))
+                for item in data.get("Search", [])
+            ],
+            next_page=page + 1 if has_more else None,
+            # Actors and genre are only known once the hits are enriched
+            needs_filter=bool(actors or genre),
+        )
+
+    async def _cached_detail(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        normalize: Callable[[Dict[str, Any]], MovieDetail],
+    ) -> Optional[MovieDetail]:
+        """
+        Return the normalized detail record for ``key``, fetching it upstream on a miss.
+
+        Records that can't be normalized into a valid Movie are cached as None
+        so they aren't fetched again until they expire.
+        """
+        entry = await self.detail_cache.get(key)
+        if entry is not None:
+            return entry.value
+
+        # Concurrent lookups of the same movie share one upstream call
+        return await self._details.do(key, lambda: self._load_detail(key, fetch, normalize))
+
+    async def _load_detail(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        normalize: Callable[[Dict[str, Any]], MovieDetail],
+    ) -> Optional[MovieDetail]:
+        """
+        Fetch and normalize a detail record upstream and store it in the detail cache
+        """
+        detail = await fetch()
         try:
-            async with session.get("http://www.omdbapi.com/", params=params) as response:
-                response.raise_for_status()
-                data = await response.json()
-
-                if data.get("Response") == "False":
-                    return []
-
-                movies = []
-                for item in data.get("Search", []):
-                    try:
-                        # Get detailed information for each movie
-                        detail_params = {"apikey": self.settings.OMDB_API_KEY, "i": item["imdbID"]}
-                        async with session.get("http://www.omdbapi.com/", params=detail_params) as detail_response:
-                            detail_response.raise_for_status()
-                            detail = await detail_response.json()
-
-                            # Filter by actors and genre if specified
-                            if (actors and not any(actor.lower() in detail.get("Actors", "").lower() for actor in actors)) or \
-                               (genre and genre.lower() not in detail.get("Genre", "").lower()):
-                                continue
-
-                            movies.append(Movie(
-                                title=detail["Title"],
-                                year=detail["Year"],
-                                type=detail["Type"],
-                                poster=detail.get("Poster"),
-                                plot=detail.get("Plot"),
-                                actors=detail.get("Actors", "").split(", "),
-                                genre=detail.get("Genre", "").split(", "),
-                                source="omdb"
-                            ))
-                    except Exception as e:
-                        print(f"Error fetching OMDB movie details: {str(e)}")
-                        continue
+            record = normalize(detail)
+        except (KeyError, ValueError) as e:
+            print(f"Invalid movie details for {key}: {str(e)}")
+            record = None
 
-                return movies
-        except Exception as e:
-            print(f"OMDB API error: {str(e)}")
-            return []
+        expires_at = time.time() + self.settings.DETAIL_CACHE_TTL
+        await self.detail_cache.set(key, CacheEntry(record, expires_at, expires_at))
+        return record
+
+    async def _get_json(
+        self,
+        session: aiohttp.ClientSession,
+        provider: str,
+        url: str,
+        params: Dict[str, Any],
+    ) -> Any:
+        """
+        GET a provider endpoint and decode its JSON body.
+
+        Every outbound request is charged to the provider's quota here, so
+        searches making several requests are counted in full. The first
+        request of a call made through ``_rate_limited`` uses the rate
+        token taken there; later ones wait for their own.
+        """
+        quota = self.quotas[provider]
+        prepaid = _prepaid.get()
+        if prepaid is not None and provider in prepaid:
+            prepaid.remove(provider)
+        else:
+            await quota.wait()
+        quota.charge()
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _rate_limited(self, provider: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Wait for one of the provider's rate tokens, then run ``call`` with
+        its first request paid for.
+
+        Waiting on our own rate limit thus happens before the circuit
+        breaker and timeouts inside ``call`` start counting. An open
+        circuit rejects the call without waiting.
+        """
+        quota = self.quotas[provider]
+        prepaid = []
+        if self.breakers[provider].state != "open":
+            await quota.wait()
+            prepaid.append(provider)
+
+        token = _prepaid.set(prepaid)
+        try:
+            return await call()
+        finally:
+            _prepaid.reset(token)
+            if prepaid:
+                quota.refund()  # The call was rejected or made no request
+
+    async def _upstream_search(self, provider: str, search: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a provider search through its circuit breaker
+        """
+        return await self._rate_limited(provider, lambda: self.breakers[provider].call(search))
+
+    async def _upstream_detail(self, provider: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        """
+        Make an upstream detail call through the provider's circuit breaker
+        in one of its PROVIDER_DETAIL_CONCURRENCY slots, hedged when
+        HEDGE_ENABLED unless its quota is low or its rate bucket is empty.
+        """
+        async def call():
+            quota = self.quotas[provider]
+            if not self.settings.HEDGE_ENABLED or quota.low or quota.throttled:
+                return await fetch()
+
+            latency = self.detail_latency[provider]
+            start = time.monotonic()
+            result = await hedge(fetch, latency.percentile(self.settings.HEDGE_PERCENTILE), self.hedges)
+            latency.record(time.monotonic() - start)
+            return result
+
+        # Queueing for a slot or a rate token happens outside the breaker so it never counts as a slow call
+        async with self._detail_semaphore(provider):
+            return await self._rate_limited(provider, lambda: asyncio.wait_for(
+                self.breakers[provider].call(call), timeout=self.settings.PROVIDER_DETAIL_TIMEOUT
+            ))
+
+    async def _fetch_omdb_detail(
+        self,
+        session: aiohttp.ClientSession,
+        imdb_id: str,
+    ) -> Optional[MovieDetail]:
+        """
+        Get the normalized OMDB detail record for an IMDb id
+        """
+        async def fetch():
+            detail_params = {"apikey": self.settings.OMDB_API_KEY, "i": imdb_id}
+            return await self._get_json(session, "omdb", "http://www.omdbapi.com/", detail_params)
+
+        def normalize(detail):
+            actors = detail.get("Actors", "").split(", ")
+            return MovieDetail(
+                movie=Movie(
+                    title=detail["Title"],
+                    year=detail["Year"],
+                    type=detail["Type"],
+                    poster=detail.get("Poster"),
+                    plot=detail.get("Plot"),
+                    actors=actors,
+                    genre=detail.get("Genre", "").split(", "),
+                    source="omdb"
+                ),
+                cast=actors,
+                imdb_id=detail.get("imdbID"),
+            )
+
+        return await self._cached_detail(f"omdb:{imdb_id}", lambda: self._upstream_detail("omdb", fetch), normalize)
+
+    async def _fetch_tmdb_detail(
+        self,
+        session: aiohttp.ClientSession,
+        movie_id: int,
+    ) -> Optional[MovieDetail]:
+        """
+        Get the normalized TMDB detail record, including cast, for a TMDB movie id
+        """
+        async def fetch():
+            detail_params = {
+                "api_key": self.settings.TMDB_API_KEY,
+                "append_to_response": "credits,external_ids"
+            }
+            return await self._get_json(session, "tmdb", f"https://api.themoviedb.org/3/movie/{movie_id}", detail_params)
+
+        def normalize(detail):
+            # Extract actors from credits
+            cast = [actor["name"] for actor in detail.get("credits", {}).get("cast", [])]
+            return MovieDetail(
+                movie=Movie(
+                    title=detail["title"],
+                    year=str(detail.get("release_date", ""))[:4],
+                    type="movie",
+                    poster=f"https://image.tmdb.org/t/p/w500{detail.get('poster_path')}" if detail.get('poster_path') else None,
+                    plot=detail.get("overview"),
+                    actors=cast[:5],  # Limit to top 5 actors
+                    genre=[g["name"] for g in detail.get("genres", [])],
+                    source="tmdb",
+                    popularity=detail.get("popularity"),
+                ),
+                cast=cast,
+                imdb_id=detail.get("external_ids", {}).get("imdb_id") or detail.get("imdb_id"),
+            )
+
+        return await self._cached_detail(f"tmdb:{movie_id}", lambda: self._upstream_detail("tmdb", fetch), normalize)
+
+    def _tmdb_hit(self, item: Dict[str, Any]) -> MovieHit:
+        """
+        Build a hit from a TMDB search, discover or credits result
+        """
+        return MovieHit(
+            id=str(item["id"]),
+            title=item.get("title"),
+            year=str(item.get("release_date") or "")[:4] or None,
+            popularity=item.get("popularity"),
+        )
 
     async def _search_tmdb(
         self,
@@ -162,67 +988,156 @@ class MovieService:
         type: Optional[str],
         genre: Optional[str],
         page: int,
-    ) -> List[Movie]:
+    ) -> ProviderPage:
+        """
+        Search movies using the TMDB API.
+
+        Genres are resolved to ids through the cached genre catalog so they
+        are filtered without any detail call: on search hits' genre_ids, or
+        upstream via discover for actor and genre-only queries. Matching
+        genre names on the enriched details is only the fallback when the
+        catalog hasn't been loaded.
+        """
+        genre_id = self.tmdb_genres.get(genre.casefold()) if genre else None
+        if genre and self.tmdb_genres and genre_id is None:
+            # TMDB has no genre by that name
+            return ProviderPage()
+        detail_genre = genre if genre_id is None else None
+
+        # If no title but we have actors, search by person first
+        if not title and actors:
+            return await self._search_tmdb_by_actors(session, actors, type, detail_genre, page, genre_id)
+
+        # Without a title, list movies through discover
+        if not title:
+            if type and type != "movie":
+                return ProviderPage()
+            items, has_more = await self._discover_tmdb(session, page, with_genres=genre_id)
+            return ProviderPage(
+                hits=[self._tmdb_hit(item) for item in items],
+                next_page=page + 1 if has_more else None,
+                needs_filter=detail_genre is not None,
+            )
+
+        # First, search for movies
+        params = {
+            "api_key": self.settings.TMDB_API_KEY,
+            "page": page,
+            "query": title,
+        }
+        data = await self._get_json(session, "tmdb", "https://api.themoviedb.org/3/search/movie", params)
+
+        items = data.get("results", [])
+        if genre_id is not None:
+            items = [item for item in items if genre_id in item.get("genre_ids", [])]
+
+        return ProviderPage(
+            hits=[self._tmdb_hit(item) for item in items],
+            next_page=page + 1 if page < data.get("total_pages", 0) else None,
+            # The cast is only known once the hits are enriched
+            needs_filter=bool(actors) or detail_genre is not None,
+        )
+
+    async def _discover_tmdb(
+        self,
+        session: aiohttp.ClientSession,
+        page: int,
+        **filters: Any,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
         """
-        Search movies using the TMDB API
+        List movies matching server-side discover filters, most popular first.
+
+        Returns the results on ``page`` and whether more pages follow. Filters
+        set to None are left out.
         """
+        params = {
+            "api_key": self.settings.TMDB_API_KEY,
+            "sort_by": "popularity.desc",
+            "page": page,
+        }
+        params.update({name: value for name, value in filters.items() if value is not None})
+        data = await self._get_json(session, "tmdb", "https://api.themoviedb.org/3/discover/movie", params)
+
+        return data.get("results", []), page < data.get("total_pages", 0)
+
+    async def _load_tmdb_genres(self):
+        """
+        Load the TMDB genre catalog used to resolve genre names to ids
+        """
+        session = await self.get_session()
+        params = {"api_key": self.settings.TMDB_API_KEY}
+        data = await self._get_json(session, "tmdb", "https://api.themoviedb.org/3/genre/movie/list", params)
+
+        self.tmdb_genres = {genre["name"].casefold(): genre["id"] for genre in data.get("genres", [])}
+
+    async def _try_load_tmdb_genres(self):
         try:
-            # First, search for movies
+            await self._load_tmdb_genres()
+        except Exception as e:
+            # Keep the last good catalog; genres fall back to matching on details
+            print(f"TMDB genre catalog error: {str(e)}")
+
+    async def _refresh_tmdb_genres(self):
+        """
+        Reload the TMDB genre catalog every GENRE_REFRESH_INTERVAL seconds
+        """
+        while True:
+            await asyncio.sleep(self.settings.GENRE_REFRESH_INTERVAL)
+            await self._try_load_tmdb_genres()
+
+    async def _cached_lookup(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return a cached TMDB lookup (person id, credits), fetching it upstream on a miss
+        """
+        entry = await self.lookup_cache.get(key)
+        if entry is not None:
+            return entry.value
+
+        async def load():
+            value = await fetch()
+            expires_at = time.time() + self.settings.DETAIL_CACHE_TTL
+            await self.lookup_cache.set(key, CacheEntry(value, expires_at, expires_at))
+            return value
+
+        return await self._details.do(key, load)
+
+    async def _resolve_tmdb_person(self, session: aiohttp.ClientSession, name: str) -> Optional[int]:
+        """
+        Resolve an actor name to the id of the best matching TMDB person
+        """
+        async def fetch():
             params = {
                 "api_key": self.settings.TMDB_API_KEY,
-                "page": page,
+                "query": name,
+                "page": 1
             }
+            person_data = await self._get_json(session, "tmdb", "https://api.themoviedb.org/3/search/person", params)
 
-            # Add search parameters
-            if title:
-                params["query"] = title
-            
-            # If no title but we have actors, search by person first
-            elif actors:
-                return await self._search_tmdb_by_actors(session, actors, type, genre, page)
-
-            async with session.get("https://api.themoviedb.org/3/search/movie", params=params) as response:
-                response.raise_for_status()
-                data = await response.json()
-
-                movies = []
-                for item in data.get("results", []):
-                    try:
-                        # Get detailed information including cast
-                        detail_params = {
-                            "api_key": self.settings.TMDB_API_KEY,
-                            "append_to_response": "credits"
-                        }
-                        async with session.get(f"https://api.themoviedb.org/3/movie/{item['id']}", params=detail_params) as detail_response:
-                            detail_response.raise_for_status()
-                            detail = await detail_response.json()
-
-                            # Extract actors from credits
-                            cast = [actor["name"] for actor in detail.get("credits", {}).get("cast", [])]
-                            
-                            # Filter by actors and genre if specified
-                            if (actors and not any(actor.lower() in name.lower() for actor in actors for name in cast)) or \
-                               (genre and not any(g["name"].lower() == genre.lower() for g in detail.get("genres", []))):
-                                continue
-
-                            movies.append(Movie(
-                                title=detail["title"],
-                                year=str(detail.get("release_date", ""))[:4],
-                                type="movie",
-                                poster=f"https://image.tmdb.org/t/p/w500{detail.get('poster_path')}" if detail.get('poster_path') else None,
-                                plot=detail.get("overview"),
-                                actors=cast[:5],  # Limit to top 5 actors
-                                genre=[g["name"] for g in detail.get("genres", [])],
-                                source="tmdb"
-                            ))
-                    except Exception as e:
-                        print(f"Error fetching TMDB movie details: {str(e)}")
-                        continue
+            results = person_data.get("results")
+            return results[0]["id"] if results else None
 
-                return movies
-        except Exception as e:
-            print(f"TMDB API error: {str(e)}")
-            return []
+        return await self._cached_lookup(f"tmdb:person:{name.casefold()}", fetch)
+
+    async def _tmdb_person_movies(self, session: aiohttp.ClientSession, person_id: int) -> List[Dict[str, Any]]:
+        """
+        List the movies a TMDB person was cast in as {id, title, release_date, popularity, genre_ids} records
+        """
+        async def fetch():
+            credits_params = {"api_key": self.settings.TMDB_API_KEY}
+            credits_data = await self._get_json(session, "tmdb", f"https://api.themoviedb.org/3/person/{person_id}/movie_credits", credits_params)
+
+            return [
+                {
+                    "id": movie["id"],
+                    "title": movie.get("title"),
+                    "release_date": movie.get("release_date"),
+                    "popularity": movie.get("popularity", 0),
+                    "genre_ids": movie.get("genre_ids", []),
+                }
+                for movie in credits_data.get("cast", [])
+            ]
+
+        return await self._cached_lookup(f"tmdb:credits:{person_id}", fetch)
 
     async def _search_tmdb_by_actors(
         self,
@@ -231,71 +1146,47 @@ class MovieService:
         type: Optional[str],
         genre: Optional[str],
         page: int,
-    ) -> List[Movie]:
+        genre_id: Optional[int] = None,
+    ) -> ProviderPage:
         """
-        Search movies by actor names in TMDB
+        Search TMDB for movies featuring all of the given actors.
+
+        Actor names are resolved to person ids through a cache. A single actor
+        is filtered server-side with discover/with_cast and with_genres; for
+        several actors their cached credit id sets are intersected locally and
+        filtered on genre_ids. No details are fetched here; hits are enriched
+        later, only for the rows returned.
         """
-        movies = []
-        try:
-            for actor in actors:
-                # Search for the actor
-                params = {
-                    "api_key": self.settings.TMDB_API_KEY,
-                    "query": actor,
-                    "page": 1
-                }
-                async with session.get("https://api.themoviedb.org/3/search/person", params=params) as person_response:
-                    person_response.raise_for_status()
-                    person_data = await person_response.json()
+        person_ids = await asyncio.gather(*(self._resolve_tmdb_person(session, actor) for actor in actors))
+        if not person_ids or None in person_ids:
+            # An unknown actor can't appear in any movie with the others
+            return ProviderPage()
 
-                    if not person_data.get("results"):
-                        continue
+        if len(person_ids) == 1:
+            items, has_more = await self._discover_tmdb(
+                session, page, with_cast=person_ids[0], with_genres=genre_id
+            )
+        else:
+            credits = await asyncio.gather(*(self._tmdb_person_movies(session, person_id) for person_id in person_ids))
+            common = set.intersection(*({movie["id"] for movie in movies} for movies in credits))
+            candidates = {
+                movie["id"]: movie for movie in credits[0]
+                if movie["id"] in common and (genre_id is None or genre_id in movie["genre_ids"])
+            }
+            ranked = sorted(candidates.values(), key=lambda movie: (-movie["popularity"], movie["id"]))
 
-                    # Get the first matching person's movies
-                    person_id = person_data["results"][0]["id"]
-                    credits_params = {"api_key": self.settings.TMDB_API_KEY}
-                    async with session.get(f"https://api.themoviedb.org/3/person/{person_id}/movie_credits", params=credits_params) as credits_response:
-                        credits_response.raise_for_status()
-                        credits_data = await credits_response.json()
-
-                        # Process each movie
-                        for movie in credits_data.get("cast", []):
-                            try:
-                                detail_params = {
-                                    "api_key": self.settings.TMDB_API_KEY,
-                                    "append_to_response": "credits"
-                                }
-                                async with session.get(f"https://api.themoviedb.org/3/movie/{movie['id']}", params=detail_params) as detail_response:
-                                    detail_response.raise_for_status()
-                                    detail = await detail_response.json()
-
-                                    if genre and not any(g["name"].lower() == genre.lower() for g in detail.get("genres", [])):
-                                        continue
-
-                                    cast = [actor["name"] for actor in detail.get("credits", {}).get("cast", [])]
-                                    
-                                    movies.append(Movie(
-                                        title=detail["title"],
-                                        year=str(detail.get("release_date", ""))[:4],
-                                        type="movie",
-                                        poster=f"https://image.tmdb.org/t/p/w500{detail.get('poster_path')}" if detail.get('poster_path') else None,
-                                        plot=detail.get("overview"),
-                                        actors=cast[:5],
-                                        genre=[g["name"] for g in detail.get("genres", [])],
-                                        source="tmdb"
-                                    ))
-                            except Exception as e:
-                                print(f"Error fetching TMDB movie details: {str(e)}")
-                                continue
-
-            return movies
-        except Exception as e:
-            print(f"TMDB API error: {str(e)}")
-            return []
+            start_idx = (page - 1) * TMDB_PAGE_SIZE
+            items = ranked[start_idx:start_idx + TMDB_PAGE_SIZE]
+            has_more = start_idx + TMDB_PAGE_SIZE < len(ranked)
+
+        return ProviderPage(
+            hits=[self._tmdb_hit(item) for item in items],
+            next_page=page + 1 if has_more else None,
+            needs_filter=genre is not None,
+        )
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close() 
\ No newline at end of file
+        await self.close()
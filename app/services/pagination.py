@@ -0,0 +1,162 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from ..models.movie import MovieHit, ProviderPage, ResultSet
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+
+# Position of a provider stream: (provider page, offset within that page's
+# hits). None once the stream is exhausted.
+Position = Optional[Tuple[int, int]]
+
+def _fingerprint(query_key: str) -> str:
+    return hashlib.sha1(query_key.encode()).hexdigest()[:12]
+
+def encode_cursor(query_key: str, positions: Dict[str, Position]) -> Optional[str]:
+    """
+    Encode provider positions as an opaque cursor, or None when every stream is exhausted
+    """
+    remaining = {name: list(position) for name, position in positions.items() if position is not None}
+    if not remaining:
+        return None
+
+    payload = json.dumps({"q": _fingerprint(query_key), "p": remaining}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, query_key: str) -> Dict[str, Position]:
+    """
+    Decode a cursor produced by ``encode_cursor`` for the same query.
+
+    Providers missing from the cursor were exhausted. Raises ValueError for
+    malformed cursors or cursors issued for a different query.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        fingerprint = payload["q"]
+        positions = {
+            name: (int(page), int(offset))
+            for name, (page, offset) in payload["p"].items()
+        }
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
+
+    if fingerprint != _fingerprint(query_key):
+        raise ValueError("Cursor does not match the search parameters")
+    if any(page < 1 or offset < 0 for page, offset in positions.values()):
+        raise ValueError("Invalid cursor")
+    return positions
+
+class StreamMerger:
+    """
+    K-way merge over provider result streams whose pages are fetched lazily.
+
+    Streams are ordered by (provider page, offset within the page, provider
+    rank), so equal page numbers from different providers interleave hit by
+    hit. When the merge reaches a page that isn't held yet, ``fetch`` is
+    called once for every stream waiting on that page number and returns
+    the extended result set. A stream whose page still isn't held afterwards
+    (the provider failed, the deadline passed or the page budget ran out)
+    stalls at its position.
+
+    Streams whose previous page needed local filtering are read ahead up
+    to ``prefetch`` pages at a time, since such pages often yield few
+    matches. ``budget`` caps the number of pages requested for such
+    streams; pages of other streams are always fetched when the merge
+    reaches them.
+
+    Iterating yields ``(provider, hit, next_position, needs_filter)``
+    events in merge order; ``hit`` is None when an empty page is skipped.
+    """
+    def __init__(
+        self,
+        result_set: ResultSet,
+        positions: Dict[str, Position],
+        providers: List[str],
+        fetch: Callable[[ResultSet, Dict[str, List[int]]], Awaitable[ResultSet]],
+        max_pages: int,
+        prefetch: int = 1,
+        budget: Optional[int] = None,
+    ):
+        self.result_set = result_set
+        self.fetch = fetch
+        self.max_pages = max_pages
+        self.prefetch = prefetch
+        self.budget = budget  # Pages that may still be requested for filtered streams, None for unbounded
+        self.truncated = False  # A stream was cut off at max_pages
+        ranks = {name: rank for rank, name in enumerate(providers)}
+        self._heap = [
+            (position[0], position[1], ranks[name], name)
+            for name, position in positions.items()
+            if position is not None and name in ranks
+        ]
+        heapq.heapify(self._heap)
+
+    def _page(self, name: str, page: int) -> Optional[ProviderPage]:
+        return self.result_set.pages.get(name, {}).get(page)
+
+    def _next_position(self, provider_page: ProviderPage, page: int, offset: int) -> Position:
+        if offset + 1 < len(provider_page.hits):
+            return (page, offset + 1)
+        next_page = provider_page.next_page
+        if next_page is None:
+            return None
+        if next_page > self.max_pages:
+            self.truncated = True
+            return None
+        return (next_page, 0)
+
+    def _wanted(self, page: int) -> Dict[str, List[int]]:
+        """
+        Pages to fetch for the streams waiting on ``page``, within the
+        budget for streams being filtered.
+
+        Every waiting stream gets ``page`` before any stream gets read-ahead
+        pages, so the budget is spent on what the merge needs first.
+        """
+        waiting = [
+            name for waiting_page, _, _, name in sorted(self._heap)
+            if waiting_page == page and self._page(name, page) is None
+        ]
+        filtered = {name: self._filtered(name, page - 1) for name in waiting}
+
+        wanted: Dict[str, List[int]] = {}
+        for ahead in range(self.prefetch):
+            for name in waiting:
+                wanted_page = page + ahead
+                if (ahead > 0 and not filtered[name]) or wanted_page > self.max_pages or \
+                        self._page(name, wanted_page) is not None:
+                    continue
+                if self.budget is not None and filtered[name]:
+                    if self.budget <= 0:
+                        return wanted
+                    self.budget -= 1
+                wanted.setdefault(name, []).append(wanted_page)
+        return wanted
+
+    def _filtered(self, name: str, page: int) -> bool:
+        provider_page = self._page(name, page)
+        return provider_page is not None and provider_page.needs_filter
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[str, Optional[MovieHit], Position, bool]]:
+        heap = self._heap
+        while heap:
+            page, offset, rank, name = heap[0]
+            provider_page = self._page(name, page)
+
+            if provider_page is None:
+                wanted = self._wanted(page)
+                if wanted:
+                    self.result_set = await self.fetch(self.result_set, wanted)
+                if self._page(name, page) is None:
+                    heapq.heappop(heap)
+                continue
+
+            heapq.heappop(heap)
+            position = self._next_position(provider_page, page, offset)
+            if position is not None:
+                heapq.heappush(heap, (position[0], position[1], rank, name))
+
+            hit = provider_page.hits[offset] if offset < len(provider_page.hits) else None
+            yield name, hit, position, provider_page.needs_filter
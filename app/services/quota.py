@@ -0,0 +1,199 @@
+from typing import Any, Callable, Dict, Optional
+from datetime import datetime, timezone
+import asyncio
+import fcntl
+import json
+import os
+import time
+
+def utc_today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+class QuotaExceededError(Exception):
+    """
+    Raised instead of calling a provider whose daily quota is used up
+    """
+
+class ProviderQuota:
+    """
+    Outbound call budget of one provider: a token bucket refilled at
+    ``rate`` calls per second (bursting to one second's worth) and a
+    ``daily_limit`` of calls per UTC day. Either may be None for no limit.
+    """
+    def __init__(
+        self,
+        rate: Optional[float],
+        daily_limit: Optional[int],
+        low_watermark: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], str] = utc_today,
+    ):
+        self.rate = rate
+        self.daily_limit = daily_limit
+        self.low_watermark = low_watermark
+        self.clock = clock
+        self.today = today
+        self.burst = max(rate or 1, 1)
+        self.tokens = self.burst
+        self.updated = clock()
+        self.day = today()
+        self.used = 0  # Calls made on ``day``
+        self.synced = 0  # Part of ``used`` already counted in the QuotaStore
+
+    def _roll(self):
+        today = self.today()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+            self.synced = 0
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """
+        Calls left today, or None without a daily limit
+        """
+        if self.daily_limit is None:
+            return None
+        self._roll()
+        return max(self.daily_limit - self.used, 0)
+
+    @property
+    def low(self) -> bool:
+        """
+        Whether the daily budget is down to the low watermark
+        """
+        remaining = self.remaining
+        return remaining is not None and remaining <= self.daily_limit * self.low_watermark
+
+    @property
+    def throttled(self) -> bool:
+        """
+        Whether the next call would have to wait for the rate bucket
+        """
+        if self.rate is None:
+            return False
+        return min(self.burst, self.tokens + (self.clock() - self.updated) * self.rate) < 1
+
+    async def wait(self):
+        """
+        Take a token from the rate bucket, waiting until one is available.
+
+        Raises QuotaExceededError without waiting once the daily limit is reached.
+        """
+        if self.remaining == 0:
+            raise QuotaExceededError("daily quota exhausted")
+        if self.rate is None:
+            return
+
+        # Reserve the token now and wait out any deficit, so callers are served in order
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            try:
+                await asyncio.sleep(-self.tokens / self.rate)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+
+    def refund(self):
+        """
+        Return a token taken by ``wait`` that no call used
+        """
+        if self.rate is not None:
+            self.tokens += 1
+
+    def charge(self):
+        """
+        Count one call against the daily limit, raising QuotaExceededError once it is reached
+        """
+        if self.remaining == 0:
+            raise QuotaExceededError("daily quota exhausted")
+        self.used += 1
+
+    async def acquire(self):
+        """
+        Take one call from the budget, waiting for the rate bucket if needed.
+
+        Raises QuotaExceededError once the daily limit is reached.
+        """
+        await self.wait()
+        try:
+            self.charge()
+        except QuotaExceededError:
+            self.refund()
+            raise
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"daily_limit": self.daily_limit, "remaining": self.remaining, "low": self.low}
+
+class QuotaStore:
+    """
+    Keep the daily call counts of provider quotas in a JSON file shared by
+    every worker, so neither a restart nor another worker resets them.
+
+    Workers add the calls they made since their last sync to the counts in
+    the file under an fcntl lock, then count on from the merged totals, so
+    the daily limits apply to all workers together, give or take the calls
+    made between syncs.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def load(self, quotas: Dict[str, ProviderQuota]):
+        self.apply(quotas, {}, self.merge({}))
+
+    def merge(self, deltas: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Add calls not yet counted, as returned by ``deltas``, to the stored
+        counts and return the new totals
+        """
+        with open(self.lock_path, "a") as lock:
+            fcntl.lockf(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.path) as f:
+                    state = json.load(f)
+                if not isinstance(state, dict):
+                    state = {}
+            except (OSError, ValueError):
+                state = {}
+
+            for name, delta in deltas.items():
+                saved = state.get(name)
+                if not isinstance(saved, dict) or saved.get("day", "") < delta["day"]:
+                    saved = {"day": delta["day"], "used": 0}
+                if saved["day"] == delta["day"]:
+                    state[name] = {"day": saved["day"], "used": int(saved.get("used", 0)) + delta["used"]}
+
+            if deltas:
+                # Write a temporary file first so a crash never leaves a truncated state
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+        return state
+
+    @staticmethod
+    def deltas(quotas: Dict[str, ProviderQuota]) -> Dict[str, Dict[str, Any]]:
+        """
+        Calls each quota made since its last sync
+        """
+        return {name: {"day": quota.day, "used": quota.used - quota.synced} for name, quota in quotas.items()}
+
+    @staticmethod
+    def apply(quotas: Dict[str, ProviderQuota], deltas: Dict[str, Dict[str, Any]], totals: Dict[str, Dict[str, Any]]):
+        """
+        Count on from the merged ``totals``, keeping calls made since ``deltas`` were taken
+        """
+        for name, quota in quotas.items():
+            quota._roll()
+            total = totals.get(name)
+            if not isinstance(total, dict) or total.get("day") != quota.day:
+                continue
+            delta = deltas.get(name)
+            merged = delta["used"] if delta is not None and delta["day"] == quota.day else 0
+            unsynced = quota.used - quota.synced - merged
+            quota.synced = int(total.get("used", 0))
+            quota.used = quota.synced + unsynced
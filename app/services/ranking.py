@@ -0,0 +1,88 @@
+from typing import Iterator, List, Literal, Optional, Tuple
+from difflib import SequenceMatcher
+from ..models.movie import Movie, MovieHit, SearchQuery
+from .dedup import normalize_title
+import heapq
+import math
+
+SortOrder = Literal["relevance", "year", "title"]
+
+# A matching search hit: (provider, hit, its movie once enriched)
+Candidate = Tuple[str, MovieHit, Optional[Movie]]
+
+def title_score(title: str, query: str) -> float:
+    """
+    How well a movie title matches the searched title, from 0 to 1
+    """
+    title, query = normalize_title(title), normalize_title(query)
+    if title == query:
+        return 1.0
+    score = SequenceMatcher(None, title, query).ratio()
+    if title.startswith(query):
+        return max(score, 0.9)
+    if query in title:
+        return max(score, 0.75)
+    return score
+
+def relevance(movie: Movie, query: SearchQuery) -> float:
+    """
+    Score a movie against the query.
+
+    Title match quality weighs most, then the share of searched actors in
+    the cast and a genre match; provider popularity only breaks near-ties.
+    """
+    score = 0.0
+    if query.title:
+        score += 3 * title_score(movie.title, query.title)
+    if query.actors:
+        cast = [actor.casefold() for actor in movie.actors]
+        score += 2 * sum(any(actor in name for name in cast) for actor in query.actors) / len(query.actors)
+    if query.genre:
+        score += any(genre.casefold() == query.genre for genre in movie.genre)
+    if movie.popularity:
+        # Log-scaled so blockbusters can't outweigh a better title match
+        score += 0.25 * min(math.log1p(movie.popularity) / math.log1p(1000), 1.0)
+    return score
+
+def top_movies(movies: List[Movie], query: SearchQuery, sort: SortOrder, k: int) -> List[Movie]:
+    """
+    Select the first ``k`` movies in ``sort`` order with a bounded heap.
+
+    Ties keep their merge order. Years sort newest first, titles
+    alphabetically ignoring a leading article.
+    """
+    if sort == "relevance":
+        return heapq.nlargest(k, movies, key=lambda movie: relevance(movie, query))
+    if sort == "year":
+        return heapq.nlargest(k, movies, key=lambda movie: int(movie.year))
+    return heapq.nsmallest(k, movies, key=lambda movie: normalize_title(movie.title))
+
+def _year(year: Optional[str]) -> int:
+    # Series years look like "2008–2013"; unknown years sort last
+    return int(year[:4]) if year and year[:4].isdigit() else -1
+
+def ranked_candidates(candidates: List[Candidate], sort: SortOrder) -> Iterator[Candidate]:
+    """
+    Yield candidates in ``year`` or ``title`` order without enriching them.
+
+    A candidate's movie is used once it has been enriched, otherwise the
+    title and year of its search hit. The window is heapified once and
+    popped lazily, so taking the first k candidates costs O(n + k log n).
+    Ties keep their merge order and hits lacking the field sort last.
+    """
+    def field(candidate: Candidate) -> Optional[str]:
+        _, hit, movie = candidate
+        source = movie if movie is not None else hit
+        return source.year if sort == "year" else source.title
+
+    if sort == "year":
+        key = lambda candidate: -_year(field(candidate))
+    elif sort == "title":
+        key = lambda candidate: (field(candidate) is None, normalize_title(field(candidate) or ""))
+    else:
+        raise ValueError("Candidates can only be ranked by year or title")
+
+    heap = [(key(candidate), index, candidate) for index, candidate in enumerate(candidates)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
@@ -0,0 +1,118 @@
+from typing import Iterator
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import uuid
+
+HEADER = struct.Struct("<8sIII16s")  # Magic, slots per bucket, buckets, slot size, boot id
+HEADER_SIZE = 64
+MAGIC = b"MSSHARE2"
+DIGEST_SIZE = 16
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+ZEROS = bytes(1 << 20)
+
+def boot_id() -> bytes:
+    """
+    Identifier of the running boot, all zeros where the kernel doesn't expose one
+    """
+    try:
+        with open(BOOT_ID_PATH) as f:
+            return uuid.UUID(f.read().strip()).bytes
+    except (OSError, ValueError):
+        return bytes(16)
+
+class SharedTable:
+    """
+    Fixed-size table of equally sized slots in a memory-mapped file, shared
+    by every worker process on a node that maps the same path.
+
+    Slots are grouped into buckets of ``ways`` slots and a key only ever
+    lives in the bucket picked by its digest, so lookups read at most
+    ``ways`` slots and the table never grows. Each bucket is guarded by an
+    fcntl lock on its first byte: unlike multiprocessing locks these work
+    between unrelated processes such as uvicorn workers, and the kernel
+    releases them if a worker dies. Every slot starts with the 16-byte
+    digest of its key, all zeros while the slot is empty; the rest of the
+    slot is up to the caller.
+
+    A file is only laid out when it is new or empty: one laid out for
+    other settings is refused, since resizing it under workers that
+    still map it would crash them. The header also records the boot the
+    slots were written in, and slots left over from an earlier boot are
+    cleared, so values on the monotonic clock never outlive a reboot.
+
+    Locks are taken synchronously on the event loop; they are only held
+    for a few struct reads and writes. POSIX only.
+    """
+    def __init__(self, path: str, slots: int, slot_size: int, ways: int = 8):
+        self.path = path
+        self.ways = ways
+        self.slot_size = slot_size
+        self.buckets = max(math.ceil(slots / ways), 1)
+        self.size = HEADER_SIZE + self.buckets * ways * slot_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._initialize()
+            self.buf = mmap.mmap(self._fd, self.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _initialize(self):
+        """
+        Size a new file and write its header, or check the layout of an
+        existing one and clear slots written before the last reboot
+        """
+        layout = HEADER.pack(MAGIC, self.ways, self.buckets, self.slot_size, b"")[:-DIGEST_SIZE]
+        header = HEADER.pack(MAGIC, self.ways, self.buckets, self.slot_size, boot_id())
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            size = os.fstat(self._fd).st_size
+            if size == 0:
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, header, 0)
+                return
+
+            current = os.pread(self._fd, HEADER.size, 0)
+            if size != self.size or current[:len(layout)] != layout:
+                raise RuntimeError(
+                    f"Shared memory file {self.path} is laid out for other settings; "
+                    "stop every worker using it and remove it, or use another path"
+                )
+            if current != header:
+                for offset in range(HEADER_SIZE, self.size, len(ZEROS)):
+                    os.pwrite(self._fd, ZEROS[:self.size - offset], offset)
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+
+    @staticmethod
+    def digest(key: str) -> bytes:
+        """
+        Stable digest of a key; Python's own hash() differs between processes
+        """
+        return hashlib.blake2b(key.encode(), digest_size=DIGEST_SIZE).digest()
+
+    def bucket_of(self, digest: bytes) -> int:
+        return int.from_bytes(digest[:8], "little") % self.buckets
+
+    @contextmanager
+    def locked(self, bucket: int) -> Iterator[range]:
+        """
+        Hold the lock of a bucket, yielding the offsets of its slots in ``buf``
+        """
+        start = HEADER_SIZE + bucket * self.ways * self.slot_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, start)
+        try:
+            yield range(start, start + self.ways * self.slot_size, self.slot_size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, start)
+
+    def close(self):
+        if not self.buf.closed:
+            self.buf.close()
+            os.close(self._fd)
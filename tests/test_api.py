@@ -1,16 +1,31 @@
 from fastapi.testclient import TestClient
+from app.config import get_settings
 from app.main import app
+from app.middleware.rate_limit import rate_limiter
 import pytest
 from unittest.mock import patch
 
 client = TestClient(app)
 
+@pytest.fixture(scope="module", autouse=True)
+def run_lifespan(tmp_path_factory):
+    # Run startup/shutdown so the shared MovieService exists, keeping quota counts out of the checkout
+    quota_path = str(tmp_path_factory.mktemp("quota") / "quota.json")
+    with patch.object(get_settings(), "QUOTA_STATE_PATH", quota_path), client:
+        yield
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    # Every test starts with a full burst
+    rate_limiter.clients.clear()
+
 def test_health_check():
     response = client.get("/api/v1/health")
     assert response.status_code == 200
     data = response.json()
     assert "status" in data
     assert "providers" in data
+    assert all("state" in circuit for circuit in data["circuits"].values())
 
 def test_search_movies_no_params():
     response = client.get("/api/v1/movies/search")
@@ -50,4 +65,42 @@ def test_pagination_limits():
 
     response = client.get("/api/v1/movies/search?title=Matrix&page=0")
     assert response.status_code == 400
-    assert "detail" in response.json() 
\ No newline at end of file
+    assert "detail" in response.json() 
+
+def test_movie_service_is_application_scoped():
+    service = app.state.movie_service
+    client.get("/api/v1/movies/search?title=Matrix")
+    client.get("/api/v1/movies/search?title=Alien")
+    assert app.state.movie_service is service
+    assert service.session is not None and not service.session.closed
+    connector = service.session.connector
+    assert connector.limit_per_host == service.settings.HTTP_POOL_SIZE_PER_HOST
+
+def test_metrics():
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert "hit_rate" in data["cache"]
+
+def test_search_movies_invalid_cursor():
+    response = client.get("/api/v1/movies/search?title=Matrix&cursor=bogus")
+    assert response.status_code == 400
+    assert "detail" in response.json()
+
+def test_search_movies_invalid_sort():
+    response = client.get("/api/v1/movies/search?title=Matrix&sort=rating")
+    assert response.status_code == 400
+    assert "detail" in response.json()
+
+def test_rate_limit_headers():
+    burst = rate_limiter.settings.RATE_LIMIT_BURST
+    for remaining in reversed(range(burst)):
+        response = client.get("/api/v1/health")
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Limit"] == str(burst)
+        assert response.headers["RateLimit-Remaining"] == str(remaining)
+
+    response = client.get("/api/v1/health")
+    assert response.status_code == 429
+    assert response.headers["RateLimit-Remaining"] == "0"
+    assert int(response.headers["Retry-After"]) >= 1
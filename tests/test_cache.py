@@ -0,0 +1,117 @@
+import os
+import time
+import pytest
+from app.models.movie import Movie, MovieResponse
+from app.services.cache import CacheEntry, MemoryCache, ModelCodec, SharedCache, SQLiteCache, TieredCache, estimate_size
+
+def make_response(title):
+    movie = Movie(
+        title=title,
+        year="1999",
+        type="movie",
+        actors=["Keanu Reeves"],
+        genre=["Action"],
+        source="omdb",
+    )
+    return MovieResponse(results=[movie], total=1, page=1, limit=10)
+
+def fresh(value, ttl=60):
+    now = time.time()
+    return CacheEntry(value, now + ttl, now + ttl)
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(maxsize=2)
+    await cache.set("a", fresh(1))
+    await cache.set("b", fresh(2))
+    await cache.get("a")
+    await cache.set("c", fresh(3))
+
+    assert (await cache.get("a")).value == 1
+    assert await cache.get("b") is None
+    assert (await cache.get("c")).value == 3
+
+@pytest.mark.asyncio
+async def test_memory_cache_drops_expired_entries():
+    cache = MemoryCache(maxsize=10)
+    await cache.set("a", fresh(1, ttl=-1))
+
+    assert await cache.get("a") is None
+    assert len(cache) == 0
+
+@pytest.mark.asyncio
+async def test_memory_cache_respects_byte_budget():
+    cache = MemoryCache(maxsize=100, max_bytes=250, weigher=len)
+    await cache.set("a", fresh("x" * 100))
+    await cache.set("b", fresh("x" * 100))
+    await cache.set("c", fresh("x" * 100))
+    await cache.set("huge", fresh("x" * 1000))
+
+    assert await cache.get("a") is None
+    assert await cache.get("huge") is None
+    assert len(cache) == 2
+    assert cache.currbytes == 200
+
+def test_estimate_size_grows_with_results():
+    small = make_response("The Matrix")
+    large = make_response("The Matrix")
+    large.results = large.results * 50
+
+    assert estimate_size(large) > estimate_size(small)
+
+@pytest.mark.asyncio
+async def test_tiered_cache_survives_restart_and_promotes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    codec = ModelCodec(MovieResponse)
+
+    cache = TieredCache(MemoryCache(maxsize=10), SQLiteCache(path, "responses", codec))
+    await cache.set("matrix", fresh(make_response("The Matrix")))
+    await cache.set("gone", fresh(make_response("Expired"), ttl=-1))
+    await cache.close()
+
+    # A new worker starts with an empty L1 and is warmed from disk
+    restarted = TieredCache(MemoryCache(maxsize=10), SQLiteCache(path, "responses", codec))
+    await restarted.warm()
+    assert len(restarted) == 1
+    assert restarted.l1.get_nowait("matrix").value.results[0].title == "The Matrix"
+
+    # Misses in L1 are served from L2 and promoted
+    restarted.l1 = MemoryCache(maxsize=10)
+    entry = await restarted.get("matrix")
+    assert entry.value.results[0].title == "The Matrix"
+    assert restarted.l1.get_nowait("matrix") is not None
+    assert await restarted.get("gone") is None
+    await restarted.close()
+
+@pytest.mark.asyncio
+async def test_shared_cache_is_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / "cache.shm")
+    codec = ModelCodec(MovieResponse)
+    worker = TieredCache(MemoryCache(maxsize=10), SharedCache(path, 16, 4096, codec))
+    await worker.set("matrix", fresh(make_response("The Matrix")))
+    await worker.set("gone", fresh(make_response("Expired"), ttl=-1))
+
+    other = TieredCache(MemoryCache(maxsize=10), SharedCache(path, 16, 4096, codec))
+    entry = await other.get("matrix")
+    assert entry.value.results[0].title == "The Matrix"
+    assert await other.get("gone") is None
+    assert [key for key, _ in await other.l2.recent(10)] == ["matrix"]
+    await worker.close()
+    await other.close()
+
+@pytest.mark.asyncio
+async def test_shared_cache_skips_oversized_values_and_reuses_expiring_slots(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.shm"), 8, 1024, ModelCodec(MovieResponse))
+    large = make_response("The Matrix")
+    large.results[0].plot = os.urandom(2048).hex()
+    await cache.set("large", fresh(large))
+    assert await cache.get("large") is None
+
+    # One bucket of 8 slots: the entry expiring soonest gives up its slot
+    for i in range(8):
+        await cache.set(f"movie {i}", fresh(make_response(f"Movie {i}"), ttl=60 + i))
+    await cache.set("newest", fresh(make_response("Newest")))
+    assert await cache.get("movie 0") is None
+    assert (await cache.get("movie 1")).value.results[0].title == "Movie 1"
+    assert (await cache.get("newest")).value.results[0].title == "Newest"
+    await cache.close()
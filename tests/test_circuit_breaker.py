@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+async def ok():
+    return "ok"
+
+async def boom():
+    raise RuntimeError("boom")
+
+def make_breaker(clock, **kwargs):
+    options = dict(failure_rate=0.5, window_size=4, min_calls=4, reset_timeout=30, half_open_calls=2, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+async def trip(breaker):
+    for _ in range(breaker.min_calls):
+        with pytest.raises(RuntimeError):
+            await breaker.call(boom)
+
+@pytest.mark.asyncio
+async def test_opens_on_failure_rate():
+    breaker = make_breaker(FakeClock())
+    for fn in (ok, boom, ok):
+        try:
+            await breaker.call(fn)
+        except RuntimeError:
+            pass
+    assert breaker.state == "closed"
+
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+@pytest.mark.asyncio
+async def test_slow_calls_count_as_failures():
+    clock = FakeClock()
+    breaker = make_breaker(clock, slow_call_duration=1)
+
+    async def slow():
+        clock.now += 2
+        return "late"
+
+    for _ in range(4):
+        assert await breaker.call(slow) == "late"
+    assert breaker.state == "open"
+
+@pytest.mark.asyncio
+async def test_half_open_probes_close_the_circuit():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    await trip(breaker)
+    assert breaker.snapshot()["retry_in"] == 30
+
+    clock.now = 30
+    assert breaker.state == "half_open"
+    release = asyncio.Event()
+
+    async def probe():
+        await release.wait()
+        return "ok"
+
+    probes = [asyncio.ensure_future(breaker.call(probe)) for _ in range(2)]
+    await asyncio.sleep(0)
+    # Only the configured number of probes are let through
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+    release.set()
+    await asyncio.gather(*probes)
+    assert breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    await trip(breaker)
+
+    clock.now = 30
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    assert breaker.state == "open"
+
+    clock.now = 59
+    assert breaker.state == "open"
+
+@pytest.mark.asyncio
+async def test_ignored_errors_count_neither_way():
+    breaker = CircuitBreaker(min_calls=1, ignored=(KeyError,))
+
+    async def refused():
+        raise KeyError("quota")
+
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            await breaker.call(refused)
+
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["calls"] == 0
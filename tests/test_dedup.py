@@ -0,0 +1,47 @@
+from app.models.movie import Movie, MovieDetail
+from app.services.dedup import MovieDeduplicator, normalize_title
+
+def make_record(title, source, year="1999", imdb_id=None, type="movie"):
+    movie = Movie(title=title, year=year, type=type, actors=["Keanu Reeves"], genre=["Action"], source=source)
+    return MovieDetail(movie=movie, cast=movie.actors, imdb_id=imdb_id)
+
+def test_normalize_title():
+    assert normalize_title("The Matrix") == "matrix"
+    assert normalize_title("  Amélie: Le Fabuleux Destin ") == "amelie le fabuleux destin"
+    assert normalize_title("A Quiet Place") == "quiet place"
+
+def test_imdb_ids_match_across_titles():
+    dedup = MovieDeduplicator()
+    kept = dedup.add(make_record("Léon: The Professional", "omdb", imdb_id="tt0110413"))
+
+    assert dedup.add(make_record("Leon", "tmdb", imdb_id="tt0110413")) is None
+    assert kept.sources == ["omdb", "tmdb"]
+
+def test_titles_match_within_adjacent_years():
+    dedup = MovieDeduplicator()
+    kept = dedup.add(make_record("The Matrix", "omdb", year="1999"))
+
+    assert dedup.add(make_record("Matrix", "tmdb", year="2000")) is None
+    assert kept.sources == ["omdb", "tmdb"]
+
+def test_distinct_movies_are_kept():
+    others = [
+        make_record("Hamlet", "omdb", year="1990"),  # Same provider
+        make_record("Hamlet", "tmdb", year="1990", type="series"),
+        make_record("Hamlet", "tmdb", year="1996"),
+        make_record("Hamlet", "tmdb", year="1990", imdb_id="tt0099727"),
+        make_record("Hamlet 2", "tmdb", year="1990"),
+    ]
+    for other in others:
+        dedup = MovieDeduplicator()
+        dedup.add(make_record("Hamlet", "omdb", year="1990", imdb_id="tt0099726"))
+        assert dedup.add(other) is not None
+
+def test_merged_movie_is_a_copy():
+    dedup = MovieDeduplicator()
+    record = make_record("The Matrix", "omdb")
+    kept = dedup.add(record)
+    dedup.add(make_record("The Matrix", "tmdb"))
+
+    assert record.movie.sources == ["omdb"]
+    assert kept.sources == ["omdb", "tmdb"]
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from app.services.hedging import HedgeBudget, LatencyTracker, hedge
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(window_size=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i)
+    assert tracker.percentile(90) is None
+
+    tracker.record(9)
+    assert tracker.percentile(90) == 8
+    assert tracker.percentile(50) == 4
+
+def test_budget_caps_the_hedge_rate():
+    budget = HedgeBudget(rate=0.25, burst=1)
+    spent = 0
+    for _ in range(100):
+        budget.earn()
+        spent += budget.spend()
+    assert spent == 25
+    assert budget.sent == 25
+
+def make_call(delays):
+    """
+    Fake call whose successive invocations take the given delays
+    """
+    calls = []
+
+    async def call():
+        index = len(calls)
+        calls.append("started")
+        try:
+            await asyncio.sleep(delays[index])
+        except asyncio.CancelledError:
+            calls[index] = "cancelled"
+            raise
+        if isinstance(delays[index], int):
+            raise RuntimeError("boom")
+        calls[index] = "done"
+        return index
+    return call, calls
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_cancelled():
+    budget = HedgeBudget(rate=1)
+    call, calls = make_call([1.0, 0.01])
+
+    assert await hedge(call, 0.02, budget) == 1
+    await asyncio.sleep(0)
+    assert calls == ["cancelled", "done"]
+    assert (budget.sent, budget.won) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_fast_call_is_not_hedged():
+    budget = HedgeBudget(rate=1)
+    call, calls = make_call([0.01])
+
+    assert await hedge(call, 0.1, budget) == 0
+    assert budget.sent == 0
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_budget():
+    budget = HedgeBudget(rate=0.5)
+    call, calls = make_call([0.05])
+
+    assert await hedge(call, 0.01, budget) == 0
+    assert calls == ["done"]
+
+@pytest.mark.asyncio
+async def test_failed_hedge_falls_back_to_the_original():
+    budget = HedgeBudget(rate=1)
+    # Ints make the fake call fail after sleeping
+    call, calls = make_call([0.05, 0])
+
+    assert await hedge(call, 0.01, budget) == 0
+    assert budget.won == 0
@@ -0,0 +1,36 @@
+import logging
+import queue
+from app.middleware.logging import DroppingQueueHandler
+
+def make_record(level, message):
+    return logging.LogRecord("test", level, __file__, 0, message, None, None)
+
+def drain(log_queue):
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get_nowait())
+    return records
+
+def test_full_queue_drops_info_but_keeps_warnings():
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    for message in ("first", "second", "third"):
+        handler.handle(make_record(logging.INFO, message))
+    handler.handle(make_record(logging.ERROR, "failure"))
+
+    assert handler.dropped == 2
+    assert [r.getMessage() for r in drain(log_queue)] == ["second", "failure"]
+
+def test_drops_are_reported_once_there_is_room():
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    for message in ("first", "second", "dropped"):
+        handler.handle(make_record(logging.INFO, message))
+    drain(log_queue)
+
+    handler.handle(make_record(logging.INFO, "next"))
+    assert [r.getMessage() for r in drain(log_queue)] == [
+        "next", "Dropped 1 log records while the log queue was full",
+    ]
+    handler.handle(make_record(logging.INFO, "last"))
+    assert [r.getMessage() for r in drain(log_queue)] == ["last"]
@@ -0,0 +1,984 @@
+import asyncio
+import pytest
+import time
+from app.config import get_settings
+from app.models.movie import Movie, MovieDetail, MovieHit, ProviderPage, SearchQuery
+from app.services.cache import CacheEntry
+from app.services.movie_service import MovieService
+
+def make_movie(title, source="omdb", year="1999"):
+    return Movie(
+        title=title,
+        year=year,
+        type="movie",
+        actors=["Keanu Reeves"],
+        genre=["Action"],
+        source=source,
+    )
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self):
+        return self.data
+
+class FakeRequest:
+    def __init__(self, handler, url, params):
+        self.handler = handler
+        self.url = url
+        self.params = params
+
+    async def __aenter__(self):
+        return FakeResponse(await self.handler(self.url, self.params))
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakeSession:
+    """
+    Stand-in for aiohttp.ClientSession routing every GET to an async handler
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.closed = False
+
+    def get(self, url, params=None):
+        self.calls.append((url, dict(params or {})))
+        return FakeRequest(self.handler, url, params or {})
+
+    async def close(self):
+        self.closed = True
+
+def omdb_detail(imdb_id, title=None):
+    return {
+        "Title": title or f"Movie {imdb_id}",
+        "Year": "1999",
+        "Type": "movie",
+        "Actors": "Keanu Reeves, Carrie-Anne Moss",
+        "Genre": "Action, Sci-Fi",
+        "imdbID": imdb_id,
+    }
+
+def make_service(**overrides):
+    settings = get_settings().copy(update=overrides)
+    return MovieService(settings)
+
+def make_page(*titles, **kwargs):
+    return ProviderPage(hits=[MovieHit(id=title, title=title) for title in titles], **kwargs)
+
+def stub_details(service, cast=("Keanu Reeves",), genre=("Action",)):
+    """
+    Replace the detail lookups with fakes building a record from the hit id
+    """
+    calls = []
+
+    def fake(source):
+        async def fetch(session, movie_id):
+            calls.append((source, movie_id))
+            movie = make_movie(movie_id, source=source)
+            movie.genre = list(genre)
+            return MovieDetail(movie=movie, cast=list(cast))
+        return fetch
+
+    service._fetch_omdb_detail = fake("omdb")
+    service._fetch_tmdb_detail = fake("tmdb")
+    return calls
+
+@pytest.mark.asyncio
+async def test_providers_are_queried_concurrently():
+    service = make_service(API_TIMEOUT=1)
+    stub_details(service)
+    started = []
+
+    async def fake_search(name, delay):
+        started.append(name)
+        await asyncio.sleep(delay)
+        return make_page(f"{name} result")
+
+    service._search_omdb = lambda *args: fake_search("omdb", 0.2)
+    service._search_tmdb = lambda *args: fake_search("tmdb", 0.2)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    response = await service.search_movies(title="Matrix")
+    elapsed = loop.time() - start
+    await service.close()
+
+    assert elapsed < 0.35
+    assert [movie.source for movie in response.results] == ["omdb", "tmdb"]
+    assert response.providers == {"omdb": "ok", "tmdb": "ok"}
+
+@pytest.mark.asyncio
+async def test_deadline_returns_partial_results_with_provider_status():
+    service = make_service(API_TIMEOUT=0.1)
+    calls = stub_details(service)
+    # The slow provider uses up the deadline, so only cached details can be used
+    record = MovieDetail(movie=make_movie("The Matrix"), cast=["Keanu Reeves"])
+    await service.detail_cache.set("omdb:The Matrix", CacheEntry(record, time.time() + 60, time.time() + 60))
+
+    async def fast(*args):
+        return make_page("The Matrix", "Uncached")
+
+    async def slow(*args):
+        await asyncio.sleep(5)
+        return make_page("Never")
+
+    service._search_omdb = fast
+    service._search_tmdb = slow
+
+    response = await service.search_movies(title="Matrix")
+    await service.close()
+
+    assert calls == []
+    assert [movie.title for movie in response.results] == ["The Matrix"]
+    assert response.next_cursor is not None
+    assert response.providers == {"omdb": "ok", "tmdb": "timed_out"}
+    # Degraded responses are not cached
+    assert len(service.cache) == 0
+
+@pytest.mark.asyncio
+async def test_failed_provider_is_reported():
+    service = make_service()
+    stub_details(service)
+
+    async def ok(*args):
+        return make_page("The Matrix")
+
+    async def broken(*args):
+        raise RuntimeError("boom")
+
+    service._search_omdb = broken
+    service._search_tmdb = ok
+
+    response = await service.search_movies(title="Matrix")
+    await service.close()
+
+    assert len(response.results) == 1
+    assert response.providers == {"omdb": "failed", "tmdb": "ok"}
+
+@pytest.mark.asyncio
+async def test_failing_provider_circuit_opens():
+    service = make_service(CIRCUIT_MIN_CALLS=2, CIRCUIT_WINDOW_SIZE=2)
+    stub_details(service)
+    calls = 0
+
+    async def broken(*args):
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("boom")
+
+    async def ok(*args):
+        return make_page("The Matrix")
+
+    service._search_omdb = broken
+    service._search_tmdb = ok
+
+    for title in ("Matrix", "Alien", "Heat"):
+        response = await service.search_movies(title=title)
+    await service.close()
+
+    assert calls == 2
+    assert response.providers == {"omdb": "circuit_open", "tmdb": "ok"}
+    assert [movie.title for movie in response.results] == ["The Matrix"]
+    assert service.circuits()["omdb"]["state"] == "open"
+
+@pytest.mark.asyncio
+async def test_calls_rejected_by_an_open_circuit_use_no_quota():
+    service = make_service(TMDB_API_KEY="", CIRCUIT_MIN_CALLS=2, CIRCUIT_WINDOW_SIZE=2)
+
+    async def handler(url, params):
+        raise RuntimeError("boom")
+
+    session = FakeSession(handler)
+    service.session = session
+    for title in ("Matrix", "Alien"):
+        await service.search_movies(title=title)
+    assert service.circuits()["omdb"]["state"] == "open"
+    used = service.quotas["omdb"].used
+
+    for title in ("Heat", "Ronin", "Tron"):
+        response = await service.search_movies(title=title)
+    await service.close()
+
+    assert response.providers == {"omdb": "circuit_open"}
+    assert service.quotas["omdb"].used == used == len(session.calls)
+
+@pytest.mark.asyncio
+async def test_waiting_for_rate_tokens_does_not_open_the_circuit():
+    service = make_service(
+        TMDB_API_KEY="", API_TIMEOUT=5, OMDB_CALLS_PER_SECOND=10,
+        CIRCUIT_MIN_CALLS=2, CIRCUIT_FAILURE_RATE=0.2, CIRCUIT_SLOW_CALL_DURATION=0.2,
+    )
+
+    async def handler(url, params):
+        await asyncio.sleep(0.01)
+        return {"Response": "False"}
+
+    service.session = FakeSession(handler)
+    # The last searches wait about half a second for a token
+    responses = await asyncio.gather(*(service.search_movies(title=f"Matrix {i}") for i in range(15)))
+    await service.close()
+
+    assert all(response.providers == {"omdb": "ok"} for response in responses)
+    assert service.circuits()["omdb"]["state"] == "closed"
+    assert service.circuits()["omdb"]["failure_rate"] == 0.0
+
+@pytest.mark.asyncio
+async def test_omdb_is_not_called_without_a_title():
+    service = make_service(TMDB_API_KEY="")
+    session = FakeSession(lambda url, params: None)
+    service.session = session
+
+    response = await service.search_movies(genre="comedy", actors=["Keanu Reeves"])
+    await service.close()
+
+    assert response.results == []
+    assert session.calls == []
+    assert service.quotas["omdb"].used == 0
+
+@pytest.mark.asyncio
+async def test_exhausted_quota_skips_the_provider():
+    service = make_service(TMDB_API_KEY="", OMDB_DAILY_QUOTA=2)
+
+    async def handler(url, params):
+        if "s" in params:
+            return {"Search": [{"imdbID": "tt0133093"}], "totalResults": "1"}
+        return omdb_detail(params["i"])
+
+    session = FakeSession(handler)
+    service.session = session
+    # One search and one detail call
+    await service.search_movies(title="Matrix")
+    response = await service.search_movies(title="Alien")
+    await service.close()
+
+    assert len(session.calls) == 2
+    assert response.providers == {"omdb": "quota_exhausted"}
+    assert service.metrics()["quota"]["omdb"] == {"daily_limit": 2, "remaining": 0, "low": True}
+
+@pytest.mark.asyncio
+async def test_low_quota_matches_filtered_hits_from_cache_only():
+    service = make_service(TMDB_API_KEY="", OMDB_DAILY_QUOTA=100, QUOTA_LOW_WATERMARK=0.5)
+    service.quotas["omdb"].used = 60
+    calls = stub_details(service, genre=("Comedy",))
+    record = MovieDetail(movie=make_movie("hit 1"), cast=["Keanu Reeves"])
+    record.movie.genre = ["Comedy"]
+    await service.detail_cache.set("omdb:hit 1", CacheEntry(record, time.time() + 60, time.time() + 60))
+
+    async def search(*args):
+        return make_page("hit 0", "hit 1", "hit 2", needs_filter=True)
+
+    service._search_omdb = search
+
+    response = await service.search_movies(title="Matrix", genre="comedy", limit=2)
+    await service.close()
+
+    assert calls == []
+    assert [movie.title for movie in response.results] == ["hit 1"]
+
+@pytest.mark.asyncio
+async def test_detail_lookups_are_bounded_and_keep_order():
+    service = make_service(TMDB_API_KEY="", PROVIDER_DETAIL_CONCURRENCY=3, PROVIDER_DETAIL_TIMEOUT=0.2)
+    in_flight = 0
+    peak = 0
+
+    async def handler(url, params):
+        nonlocal in_flight, peak
+        if "s" in params:
+            first = (params["page"] - 1) * 10
+            return {"Search": [{"imdbID": f"tt{i}"} for i in range(first, first + 10)], "totalResults": "20"}
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            # Later hits answer first; tt5 never answers in time
+            await asyncio.sleep(1 if params["i"] == "tt5" else 0.01 * (10 - int(params["i"][2:])))
+        finally:
+            in_flight -= 1
+        return omdb_detail(params["i"])
+
+    service.session = FakeSession(handler)
+    response = await service.search_movies(title="Matrix", limit=10)
+    await service.close()
+
+    assert peak == 3
+    # The page is refilled past the hit whose details timed out
+    assert [movie.title for movie in response.results] == [f"Movie tt{i}" for i in range(11) if i != 5]
+
+@pytest.mark.asyncio
+async def test_timed_out_detail_calls_are_cancelled_upstream():
+    service = make_service(TMDB_API_KEY="", API_TIMEOUT=0.2, PROVIDER_DETAIL_CONCURRENCY=2, PROVIDER_DETAIL_TIMEOUT=3)
+    in_flight = 0
+    peak = 0
+
+    async def handler(url, params):
+        nonlocal in_flight, peak
+        if "s" in params:
+            return {"Search": [{"imdbID": f"tt{i}"} for i in range(10)], "totalResults": "10"}
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(5)
+        finally:
+            in_flight -= 1
+
+    service.session = FakeSession(handler)
+    response = await service.search_movies(title="Matrix")
+    await asyncio.sleep(0.01)
+    await service.close()
+
+    assert response.results == []
+    assert peak == 2
+    # Nobody waits for the slow calls any more, so they were cancelled
+    assert in_flight == 0
+
+@pytest.mark.asyncio
+async def test_hits_with_invalid_details_do_not_shorten_the_page():
+    service = make_service(TMDB_API_KEY="")
+
+    async def handler(url, params):
+        if "s" in params:
+            return {"Search": [{"imdbID": f"tt{i}"} for i in range(10)], "totalResults": "10"}
+        detail = omdb_detail(params["i"])
+        if int(params["i"][2:]) % 2:
+            detail["Year"] = "2008\u20132013"  # Series year ranges aren't valid movie years
+        return detail
+
+    service.session = FakeSession(handler)
+    response = await service.search_movies(title="Matrix", limit=5)
+    await service.close()
+
+    assert [movie.title for movie in response.results] == [f"Movie tt{i}" for i in range(0, 10, 2)]
+
+@pytest.mark.asyncio
+async def test_detail_lookups_share_the_request_deadline():
+    service = make_service(TMDB_API_KEY="", API_TIMEOUT=0.2, PROVIDER_DETAIL_TIMEOUT=3)
+    delay = 1
+
+    async def search(*args):
+        return make_page(*(f"hit {i}" for i in range(10)))
+
+    async def detail(session, movie_id):
+        await asyncio.sleep(delay)
+        return MovieDetail(movie=make_movie(movie_id), cast=["Keanu Reeves"])
+
+    service._search_omdb = search
+    service._fetch_omdb_detail = detail
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first = await service.search_movies(title="Matrix", limit=10)
+    elapsed = loop.time() - start
+
+    # A partial page comes back in time and the cursor resumes at the first missing hit
+    delay = 0
+    second = await service.search_movies(title="Matrix", limit=10, cursor=first.next_cursor)
+    await service.close()
+
+    assert elapsed < 0.5
+    assert first.results == []
+    assert not first.exhaustive
+    assert [movie.title for movie in second.results] == [f"hit {i}" for i in range(10)]
+
+@pytest.mark.asyncio
+async def test_slow_detail_calls_are_hedged():
+    service = make_service(TMDB_API_KEY="", HEDGE_ENABLED=True, HEDGE_MIN_SAMPLES=5, HEDGE_MAX_RATE=1)
+    for _ in range(5):
+        service.detail_latency["omdb"].record(0.01)
+    attempts = []
+
+    async def handler(url, params):
+        if "s" in params:
+            return {"Search": [{"imdbID": "tt0133093"}], "totalResults": "1"}
+        attempts.append(params["i"])
+        # The first attempt stalls, the hedge answers right away
+        if len(attempts) == 1:
+            await asyncio.sleep(5)
+        return omdb_detail(params["i"])
+
+    service.session = FakeSession(handler)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    response = await service.search_movies(title="Matrix")
+    elapsed = loop.time() - start
+    await service.close()
+
+    assert elapsed < 1
+    assert attempts == ["tt0133093", "tt0133093"]
+    assert len(response.results) == 1
+    assert service.metrics()["hedges"] == {"sent": 1, "won": 1}
+
+@pytest.mark.asyncio
+async def test_detail_records_are_shared_across_queries():
+    service = make_service(TMDB_API_KEY="")
+
+    async def handler(url, params):
+        if "s" in params:
+            return {"Search": [{"imdbID": "tt0133093"}], "totalResults": "1"}
+        return omdb_detail(params["i"], title="The Matrix")
+
+    session = FakeSession(handler)
+    service.session = session
+    first = await service.search_movies(title="Matrix")
+    second = await service.search_movies(title="The Matrix", type="movie")
+    filtered = await service.search_movies(title="Matrix", genre="Comedy")
+    await service.close()
+
+    detail_calls = [params for url, params in session.calls if "i" in params]
+    assert len(detail_calls) == 1
+    record = (await service.detail_cache.get("omdb:tt0133093")).value
+    assert first.results == second.results == [record.movie]
+    assert filtered.results == []
+    assert filtered.total == 0
+
+@pytest.mark.asyncio
+async def test_only_returned_hits_are_enriched():
+    service = make_service()
+    calls = stub_details(service)
+
+    def provider(name):
+        async def search(*args):
+            return make_page(*(f"{name} {i}" for i in range(10)))
+        return search
+
+    service._search_omdb = provider("omdb")
+    service._search_tmdb = provider("tmdb")
+
+    first = await service.search_movies(title="Matrix", limit=3)
+    second = await service.search_movies(title="Matrix", limit=3, cursor=first.next_cursor)
+    await service.close()
+
+    assert sorted(calls) == [("omdb", "omdb 0"), ("omdb", "omdb 1"), ("omdb", "omdb 2"),
+                             ("tmdb", "tmdb 0"), ("tmdb", "tmdb 1"), ("tmdb", "tmdb 2")]
+    assert [movie.source for movie in second.results] == ["tmdb", "omdb", "tmdb"]
+    assert first.total == 20
+
+@pytest.mark.asyncio
+async def test_filtered_hits_are_enriched_until_the_page_is_full():
+    service = make_service(TMDB_API_KEY="")
+    calls = stub_details(service, genre=("Comedy",))
+
+    async def search(*args):
+        return make_page(*(f"hit {i}" for i in range(10)), needs_filter=True)
+
+    service._search_omdb = search
+
+    response = await service.search_movies(title="Matrix", genre="comedy", limit=2)
+    await service.close()
+
+    assert [movie.title for movie in response.results] == ["hit 0", "hit 1"]
+    assert calls == [("omdb", "hit 0"), ("omdb", "hit 1")]
+    # Filtered hits only count once they match
+    assert response.total == 2
+
+@pytest.mark.asyncio
+async def test_identical_searches_are_coalesced():
+    service = make_service()
+    stub_details(service)
+    calls = 0
+    release = asyncio.Event()
+
+    async def omdb(*args):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return make_page("The Matrix")
+
+    async def tmdb(*args):
+        return ProviderPage()
+
+    service._search_omdb = omdb
+    service._search_tmdb = tmdb
+
+    leader = asyncio.ensure_future(service.search_movies(title="Matrix"))
+    cancelled = asyncio.ensure_future(service.search_movies(title="Matrix"))
+    follower = asyncio.ensure_future(service.search_movies(title="Matrix"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    first, second = await asyncio.gather(leader, follower)
+    await service.close()
+
+    assert calls == 1
+    assert first == second
+    assert cancelled.cancelled()
+    assert len(service._searches) == 0
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_served_while_refreshing():
+    service = make_service(CACHE_SOFT_TTL=0)
+    stub_details(service)
+    titles = iter(["First", "Second", "Third"])
+    release = asyncio.Event()
+    release.set()
+
+    async def omdb(*args):
+        await release.wait()
+        return make_page(next(titles))
+
+    async def tmdb(*args):
+        return ProviderPage()
+
+    service._search_omdb = omdb
+    service._search_tmdb = tmdb
+
+    first = await service.search_movies(title="Matrix")
+    release.clear()
+    stale = await service.search_movies(title="Matrix")
+    assert stale == first
+    assert len(service._refreshes) == 1
+
+    release.set()
+    await asyncio.gather(*service._refreshes)
+    refreshed = await service.search_movies(title="Matrix")
+    await service.close()
+
+    assert [movie.title for movie in refreshed.results] == ["Second"]
+
+def test_equivalent_queries_share_a_key():
+    first = SearchQuery.normalize("Matrix", ["Keanu Reeves", "Carrie-Anne Moss"], "Movie", "Sci-Fi")
+    second = SearchQuery.normalize(" matrix ", ["carrie-anne  moss", "Keanu Reeves", "keanu reeves"], "movie", "sci-fi")
+
+    assert first.key == second.key
+    assert second.actors == ("carrie-anne moss", "keanu reeves")
+    assert SearchQuery.normalize(title="   ", actors=[" "]).is_empty
+
+@pytest.mark.asyncio
+async def test_normalized_queries_hit_the_cache():
+    service = make_service()
+    stub_details(service)
+    calls = 0
+
+    async def omdb(*args):
+        nonlocal calls
+        calls += 1
+        return make_page("The Matrix")
+
+    async def tmdb(*args):
+        return ProviderPage()
+
+    service._search_omdb = omdb
+    service._search_tmdb = tmdb
+
+    await service.search_movies(title="Matrix", actors=["Keanu Reeves", "Carrie-Anne Moss"])
+    await service.search_movies(title="matrix ", actors=["Carrie-Anne Moss", "Keanu Reeves"])
+    await service.close()
+
+    assert calls == 1
+    assert service.metrics()["cache"] == {"hits": 1, "stale_hits": 0, "misses": 1, "hit_rate": 0.5}
+
+@pytest.mark.asyncio
+async def test_result_set_is_fetched_once_and_paged_locally():
+    service = make_service()
+    stub_details(service)
+    requested = []
+
+    async def omdb(session, title, actors, type, genre, page):
+        requested.append(page)
+        return make_page(*(f"Matrix {page}-{i}" for i in range(10)), next_page=page + 1 if page < 3 else None)
+
+    async def tmdb(*args):
+        return ProviderPage()
+
+    service._search_omdb = omdb
+    service._search_tmdb = tmdb
+
+    first = await service.search_movies(title="Matrix", page=1, limit=5)
+    second = await service.search_movies(title="Matrix", page=2, limit=5)
+    assert requested == [1]
+    assert [movie.title for movie in second.results] == [f"Matrix 1-{i}" for i in range(5, 10)]
+
+    # Paging past the held results fetches only the next provider page
+    third = await service.search_movies(title="Matrix", page=3, limit=5)
+    assert requested == [1, 2]
+    assert third.results[0].title == "Matrix 2-0"
+
+    # The extended set is cached for every page/limit combination
+    await service.search_movies(title="Matrix", page=1, limit=20)
+    beyond = await service.search_movies(title="Matrix", page=5, limit=10)
+    await service.close()
+
+    assert requested == [1, 2, 3]
+    assert beyond.results == []
+    assert beyond.total == 30
+
+@pytest.mark.asyncio
+async def test_cursor_pages_through_interleaved_streams_without_refetching():
+    service = make_service()
+    stub_details(service)
+    requested = []
+
+    def provider(name, per_page, pages):
+        async def search(session, title, actors, type, genre, page):
+            requested.append((name, page))
+            return make_page(*(f"{name} {page}-{i}" for i in range(per_page)), next_page=page + 1 if page < pages else None)
+        return search
+
+    service._search_omdb = provider("omdb", 3, 2)
+    service._search_tmdb = provider("tmdb", 2, 1)
+
+    first = await service.search_movies(title="Matrix", limit=4)
+    assert [movie.title for movie in first.results] == ["omdb 1-0", "tmdb 1-0", "omdb 1-1", "tmdb 1-1"]
+    assert requested == [("omdb", 1), ("tmdb", 1)]
+
+    second = await service.search_movies(title="Matrix", limit=4, cursor=first.next_cursor)
+    assert [movie.title for movie in second.results] == ["omdb 1-2", "omdb 2-0", "omdb 2-1", "omdb 2-2"]
+    assert requested == [("omdb", 1), ("tmdb", 1), ("omdb", 2)]
+    assert second.next_cursor is None
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_cursor_must_match_the_query():
+    service = make_service()
+    stub_details(service)
+
+    async def search(*args):
+        return make_page("The Matrix", next_page=2)
+
+    service._search_omdb = search
+    service._search_tmdb = search
+
+    response = await service.search_movies(title="Matrix", limit=1)
+    with pytest.raises(ValueError):
+        await service.search_movies(title="Alien", limit=1, cursor=response.next_cursor)
+    with pytest.raises(ValueError):
+        await service.search_movies(title="Matrix", limit=1, cursor="not-a-cursor")
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_movies_from_both_providers_are_merged():
+    service = make_service()
+    records = {
+        ("omdb", "tt0133093"): ("The Matrix", "tt0133093", None),
+        ("omdb", "tt0234215"): ("The Matrix Reloaded", "tt0234215", None),
+        ("tmdb", "603"): ("Matrix", "tt0133093", "Plot from TMDB"),
+        ("tmdb", "604"): ("The Matrix Reloaded", None, None),
+        ("tmdb", "605"): ("The Matrix Revolutions", "tt0242653", None),
+    }
+
+    def fetch(source):
+        async def detail(session, movie_id):
+            title, imdb_id, plot = records[(source, movie_id)]
+            movie = make_movie(title, source=source)
+            movie.plot = plot
+            return MovieDetail(movie=movie, cast=["Keanu Reeves"], imdb_id=imdb_id)
+        return detail
+
+    async def omdb(*args):
+        return ProviderPage(hits=[MovieHit(id="tt0133093"), MovieHit(id="tt0234215")])
+
+    async def tmdb(*args):
+        return ProviderPage(hits=[MovieHit(id="603"), MovieHit(id="604"), MovieHit(id="605")])
+
+    service._search_omdb = omdb
+    service._search_tmdb = tmdb
+    service._fetch_omdb_detail = fetch("omdb")
+    service._fetch_tmdb_detail = fetch("tmdb")
+
+    response = await service.search_movies(title="Matrix", limit=3)
+    await service.close()
+
+    # Matched by IMDb id, then by title and year; the page is refilled
+    assert [movie.title for movie in response.results] == ["The Matrix", "The Matrix Reloaded", "The Matrix Revolutions"]
+    assert [movie.sources for movie in response.results] == [["omdb", "tmdb"], ["omdb", "tmdb"], ["tmdb"]]
+    assert response.results[0].plot == "Plot from TMDB"
+
+@pytest.mark.asyncio
+async def test_sorted_results_are_ranked_over_the_window():
+    service = make_service(RANK_WINDOW=6)
+    calls = stub_details(service)
+
+    async def omdb(*args):
+        return make_page("Matrix Reloaded", "Animatrix", "Matrix Fans", "Matrix Trilogy", next_page=2)
+
+    async def tmdb(*args):
+        return make_page("Matrix", "Matrix Revolutions", "Other")
+
+    service._search_omdb = omdb
+    service._search_tmdb = tmdb
+
+    first = await service.search_movies(title="Matrix", limit=2, sort="relevance")
+    # Only the window of the first six matches is enriched and ranked
+    assert len(calls) == 6
+    second = await service.search_movies(title="Matrix", page=2, limit=2, sort="relevance")
+    with pytest.raises(ValueError):
+        await service.search_movies(title="Matrix", sort="title", cursor=first.next_cursor or "x")
+    await service.close()
+
+    # Equally good matches keep their merge order; "Matrix Trilogy" is outside the window
+    assert [movie.title for movie in first.results] == ["Matrix", "Matrix Reloaded"]
+    assert [movie.title for movie in second.results] == ["Matrix Revolutions", "Matrix Fans"]
+    assert first.next_cursor is None
+    assert not first.exhaustive
+
+@pytest.mark.asyncio
+async def test_title_sort_enriches_only_the_selected_page():
+    service = make_service(TMDB_API_KEY="", RANK_WINDOW=6)
+    calls = []
+
+    async def detail(session, movie_id):
+        calls.append(movie_id)
+        if movie_id == "Matrix Fans":
+            return None
+        return MovieDetail(movie=make_movie(movie_id), cast=["Keanu Reeves"])
+
+    async def search(*args):
+        return make_page("Matrix Trilogy", "Matrix Reloaded", "Animatrix", "Matrix Fans", "Matrix", "Matrix Revolutions")
+
+    service._search_omdb = search
+    service._fetch_omdb_detail = detail
+
+    first = await service.search_movies(title="Matrix", limit=2, sort="title")
+    assert calls == ["Animatrix", "Matrix"]
+    # "Matrix Fans" has no details, so the next ranked hit takes its place
+    second = await service.search_movies(title="Matrix", page=2, limit=2, sort="title")
+    await service.close()
+
+    assert [movie.title for movie in first.results] == ["Animatrix", "Matrix"]
+    assert [movie.title for movie in second.results] == ["Matrix Reloaded", "Matrix Revolutions"]
+    assert calls == ["Animatrix", "Matrix", "Matrix Fans", "Matrix Reloaded", "Matrix Revolutions"]
+
+@pytest.mark.asyncio
+async def test_low_quota_ranks_only_the_requested_page():
+    service = make_service(TMDB_API_KEY="", RANK_WINDOW=6, OMDB_DAILY_QUOTA=100, QUOTA_LOW_WATERMARK=0.5)
+    service.quotas["omdb"].used = 60
+    calls = stub_details(service)
+
+    async def search(*args):
+        return make_page("Matrix Reloaded", "Animatrix", "Matrix", "Matrix Revolutions")
+
+    service._search_omdb = search
+
+    response = await service.search_movies(title="Matrix", limit=2, sort="relevance")
+    await service.close()
+
+    assert len(calls) == 2
+    assert [movie.title for movie in response.results] == ["Matrix Reloaded", "Animatrix"]
+
+def filtered_pages(requested, last_page):
+    async def search(session, title, actors, type, genre, page):
+        requested.append(page)
+        return make_page(f"{page}-0", f"{page}-1", next_page=page + 1 if page < last_page else None, needs_filter=True)
+    return search
+
+@pytest.mark.asyncio
+async def test_filtered_scan_reads_ahead_until_the_page_is_full():
+    service = make_service(TMDB_API_KEY="", PROVIDER_PREFETCH_PAGES=3)
+    requested = []
+
+    async def detail(session, movie_id):
+        movie = make_movie(movie_id)
+        movie.genre = ["Comedy"] if movie_id.startswith("5-") else ["Action"]
+        return MovieDetail(movie=movie, cast=["Keanu Reeves"])
+
+    service._search_omdb = filtered_pages(requested, 8)
+    service._fetch_omdb_detail = detail
+
+    response = await service.search_movies(title="Matrix", genre="comedy", limit=2)
+    await service.close()
+
+    # Page 1 is fetched alone, later pages three at a time
+    assert requested == [1, 2, 3, 4, 5, 6, 7]
+    assert [movie.title for movie in response.results] == ["5-0", "5-1"]
+    assert not response.exhaustive
+
+@pytest.mark.asyncio
+async def test_filtered_scan_stops_at_the_page_budget():
+    service = make_service(TMDB_API_KEY="", PROVIDER_PREFETCH_PAGES=2, PROVIDER_SCAN_PAGES=3)
+    stub_details(service)
+    requested = []
+    service._search_omdb = filtered_pages(requested, 8)
+
+    # The first page isn't known to need filtering yet, so it is outside the budget
+    first = await service.search_movies(title="Matrix", genre="comedy", limit=2)
+    assert requested == [1, 2, 3, 4]
+    assert first.results == []
+    assert not first.exhaustive
+
+    second = await service.search_movies(title="Matrix", genre="comedy", limit=2, cursor=first.next_cursor)
+    assert requested == [1, 2, 3, 4, 5, 6, 7]
+    assert not second.exhaustive
+
+    third = await service.search_movies(title="Matrix", genre="comedy", limit=2, cursor=second.next_cursor)
+    await service.close()
+
+    assert requested == [1, 2, 3, 4, 5, 6, 7, 8, 9]  # Read ahead past the last page, unknown until page 8 arrives
+    assert third.next_cursor is None
+    assert third.exhaustive
+
+def paging_handler():
+    """
+    OMDB and TMDB both returning "Alpha", and an OMDB hit with invalid details
+    """
+    omdb_titles = ["Alpha", "Bravo", "Charlie", "Delta", "Echo", "Foxtrot", "Golf", "Hotel"]
+    tmdb_titles = ["Alpha", "India", "Juliett", "Kilo", "Lima"]
+
+    async def handler(url, params):
+        if "s" in params:
+            return {
+                "Search": [{"imdbID": f"tt{i}", "Title": title} for i, title in enumerate(omdb_titles)],
+                "totalResults": str(len(omdb_titles)),
+            }
+        if "i" in params:
+            detail = omdb_detail(params["i"], omdb_titles[int(params["i"][2:])])
+            if params["i"] == "tt1":
+                del detail["Title"]
+            return detail
+        if url.endswith("/search/movie"):
+            return {"results": [{"id": i, "title": title} for i, title in enumerate(tmdb_titles)], "total_pages": 1}
+        movie_id = int(url.rsplit("/", 1)[1])
+        return {
+            "title": tmdb_titles[movie_id],
+            "release_date": "1999-03-31",
+            "genres": [{"name": "Action"}],
+            "credits": {"cast": [{"name": "Keanu Reeves"}]},
+            "external_ids": {"imdb_id": "tt0" if movie_id == 0 else None},
+        }
+    return handler
+
+@pytest.mark.asyncio
+async def test_page_numbers_walk_the_same_results_as_cursors():
+    expected = ["Alpha", "India", "Charlie", "Juliett", "Delta", "Kilo", "Echo", "Lima", "Foxtrot", "Golf", "Hotel"]
+
+    service = make_service(OMDB_API_KEY="key", TMDB_API_KEY="key")
+    service.session = FakeSession(paging_handler())
+    by_page = []
+    for page in range(1, 6):
+        response = await service.search_movies(title="Alpha", page=page, limit=3)
+        by_page.extend(movie.title for movie in response.results)
+    await service.close()
+
+    service = make_service(OMDB_API_KEY="key", TMDB_API_KEY="key")
+    service.session = FakeSession(paging_handler())
+    by_cursor = []
+    cursor = None
+    while True:
+        response = await service.search_movies(title="Alpha", limit=3, cursor=cursor)
+        by_cursor.extend(movie.title for movie in response.results)
+        cursor = response.next_cursor
+        if cursor is None:
+            break
+    await service.close()
+
+    # Neither the duplicate "Alpha" nor the invalid "Bravo" shifts the next page
+    assert by_cursor == expected
+    assert by_page == expected
+
+@pytest.mark.asyncio
+async def test_title_sorted_pages_do_not_overlap():
+    service = make_service(OMDB_API_KEY="key", TMDB_API_KEY="key")
+    service.session = FakeSession(paging_handler())
+    by_page = []
+    for page in range(1, 5):
+        response = await service.search_movies(title="Alpha", page=page, limit=3, sort="title")
+        by_page.append([movie.title for movie in response.results])
+    await service.close()
+
+    # Both providers' "Alpha" rank next to each other and merge; "Bravo" has invalid details
+    assert by_page == [
+        ["Alpha", "Charlie", "Delta"],
+        ["Echo", "Foxtrot", "Golf"],
+        ["Hotel", "India", "Juliett"],
+        ["Kilo", "Lima"],
+    ]
+
+def test_every_searched_actor_must_be_in_the_cast():
+    service = make_service()
+    record = MovieDetail(movie=make_movie("The Matrix"), cast=["Keanu Reeves", "Carrie-Anne Moss"])
+    both = SearchQuery.normalize("Matrix", ["Keanu Reeves", "Carrie-Anne Moss"], None, None)
+    other = SearchQuery.normalize("Matrix", ["Keanu Reeves", "Sandra Bullock"], None, None)
+
+    for provider in ("omdb", "tmdb"):
+        assert service._matches(provider, record, both)
+        assert not service._matches(provider, record, other)
+
+@pytest.mark.asyncio
+async def test_page_budget_does_not_limit_unfiltered_pages():
+    service = make_service(TMDB_API_KEY="", PROVIDER_SCAN_PAGES=1)
+    stub_details(service)
+
+    async def search(session, title, actors, type, genre, page):
+        return make_page(*(f"{page}-{i}" for i in range(10)), next_page=page + 1 if page < 8 else None)
+
+    service._search_omdb = search
+
+    response = await service.search_movies(title="Matrix", page=4, limit=10)
+    await service.close()
+
+    assert [movie.title for movie in response.results] == [f"4-{i}" for i in range(10)]
+
+@pytest.mark.asyncio
+async def test_single_actor_search_uses_discover_and_cached_person_ids():
+    service = make_service()
+
+    async def handler(url, params):
+        if url.endswith("/search/person"):
+            return {"results": [{"id": 6384}]}
+        if url.endswith("/discover/movie"):
+            assert params["with_cast"] == 6384
+            return {"results": [{"id": 603}, {"id": 604}], "total_pages": 3}
+
+    session = FakeSession(handler)
+    first = await service._search_tmdb(session, None, ["keanu reeves"], None, None, 1)
+    await service._search_tmdb(session, None, ["keanu reeves"], None, None, 2)
+
+    assert [hit.id for hit in first.hits] == ["603", "604"]
+    assert first.next_page == 2
+    assert sum(url.endswith("/search/person") for url, _ in session.calls) == 1
+
+@pytest.mark.asyncio
+async def test_multiple_actors_are_intersected_locally():
+    service = make_service()
+    credits = {
+        1: [{"id": 603, "popularity": 50}, {"id": 604, "popularity": 80}, {"id": 10, "popularity": 99}],
+        2: [{"id": 604, "popularity": 80}, {"id": 603, "popularity": 50}, {"id": 20, "popularity": 99}],
+    }
+
+    async def handler(url, params):
+        if url.endswith("/search/person"):
+            return {"results": [{"id": 1 if params["query"] == "keanu reeves" else 2}]}
+        if url.endswith("/movie_credits"):
+            return {"cast": credits[int(url.split("/")[-2])]}
+
+    session = FakeSession(handler)
+    page = await service._search_tmdb(session, None, ["carrie-anne moss", "keanu reeves"], None, None, 1)
+
+    assert [hit.id for hit in page.hits] == ["604", "603"]
+    assert page.next_page is None
+    # Every person search and credit list is charged to the quota
+    assert service.quotas["tmdb"].used == len(session.calls) == 4
+    # Hits are enriched lazily by search_movies, not by the provider search
+    assert not any(url.rsplit("/", 1)[1].isdigit() for url, _ in session.calls)
+
+@pytest.mark.asyncio
+async def test_genres_are_filtered_upstream_with_the_catalog():
+    service = make_service()
+
+    async def handler(url, params):
+        if url.endswith("/genre/movie/list"):
+            return {"genres": [{"id": 28, "name": "Action"}, {"id": 35, "name": "Comedy"}]}
+        if url.endswith("/discover/movie"):
+            assert params["with_genres"] == 28
+            return {"results": [{"id": 603}], "total_pages": 1}
+        if url.endswith("/search/movie"):
+            return {"results": [{"id": 603, "genre_ids": [28]}, {"id": 9, "genre_ids": [35]}], "total_pages": 1}
+
+    session = FakeSession(handler)
+    service.session = session
+    await service._load_tmdb_genres()
+
+    genre_only = await service._search_tmdb(session, None, None, None, "action", 1)
+    with_title = await service._search_tmdb(session, "matrix", None, None, "action", 1)
+    unknown = await service._search_tmdb(session, "matrix", None, None, "western", 1)
+
+    assert [hit.id for hit in genre_only.hits] == ["603"]
+    assert [hit.id for hit in with_title.hits] == ["603"]
+    assert unknown.hits == []
+    assert service.quotas["tmdb"].used == len(session.calls)
+    assert not any(url.rsplit("/", 1)[1].isdigit() for url, _ in session.calls)
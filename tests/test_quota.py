@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.services.quota import ProviderQuota, QuotaExceededError, QuotaStore
+
+class FakeDay:
+    def __init__(self, day="2026-10-15"):
+        self.day = day
+
+    def __call__(self):
+        return self.day
+
+@pytest.mark.asyncio
+async def test_daily_limit_resets_each_day():
+    today = FakeDay()
+    quota = ProviderQuota(rate=None, daily_limit=10, low_watermark=0.2, today=today)
+    for _ in range(8):
+        await quota.acquire()
+    assert quota.remaining == 2
+    assert quota.low
+
+    await quota.acquire()
+    await quota.acquire()
+    with pytest.raises(QuotaExceededError):
+        await quota.acquire()
+
+    today.day = "2026-10-16"
+    assert quota.remaining == 10
+    assert not quota.low
+
+@pytest.mark.asyncio
+async def test_rate_bucket_spaces_out_calls():
+    quota = ProviderQuota(rate=50, daily_limit=None)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    # The first 50 calls are the burst, the next 5 wait 20ms each
+    for _ in range(55):
+        await quota.acquire()
+
+    assert 0.08 <= loop.time() - start < 0.5
+    assert quota.remaining is None
+
+def sync(store, quotas):
+    deltas = QuotaStore.deltas(quotas)
+    QuotaStore.apply(quotas, deltas, store.merge(deltas))
+
+def test_daily_counts_survive_a_restart(tmp_path):
+    today = FakeDay()
+    store = QuotaStore(str(tmp_path / "quota.json"))
+    quota = ProviderQuota(rate=None, daily_limit=100, today=today)
+    quota.used = 42
+    sync(store, {"omdb": quota})
+
+    restarted = ProviderQuota(rate=None, daily_limit=100, today=today)
+    store.load({"omdb": restarted})
+    assert restarted.remaining == 58
+
+    # Counts from another day are ignored
+    tomorrow = ProviderQuota(rate=None, daily_limit=100, today=FakeDay("2026-10-16"))
+    store.load({"omdb": tomorrow})
+    assert tomorrow.remaining == 100
+
+def test_workers_share_the_daily_counts(tmp_path):
+    today = FakeDay()
+    store = QuotaStore(str(tmp_path / "quota.json"))
+    first = ProviderQuota(rate=None, daily_limit=100, today=today)
+    second = ProviderQuota(rate=None, daily_limit=100, today=today)
+    first.used = 30
+    second.used = 5
+
+    # A worker saving last with fewer calls doesn't reset the others' counts
+    sync(store, {"omdb": first})
+    sync(store, {"omdb": second})
+    assert second.remaining == 65
+    first.used += 1
+    sync(store, {"omdb": first})
+    assert first.remaining == 64
+
+    restarted = ProviderQuota(rate=None, daily_limit=100, today=today)
+    store.load({"omdb": restarted})
+    assert restarted.remaining == 64
+
+def test_missing_state_file_is_ignored(tmp_path):
+    quota = ProviderQuota(rate=None, daily_limit=100)
+    QuotaStore(str(tmp_path / "missing.json")).load({"omdb": quota})
+    assert quota.remaining == 100
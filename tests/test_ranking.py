@@ -0,0 +1,56 @@
+from app.models.movie import Movie, MovieHit, SearchQuery
+from app.services.ranking import ranked_candidates, relevance, title_score, top_movies
+
+def make_movie(title, year="1999", actors=("Keanu Reeves",), genre=("Action",), popularity=None):
+    return Movie(
+        title=title,
+        year=year,
+        type="movie",
+        actors=list(actors),
+        genre=list(genre),
+        source="tmdb",
+        popularity=popularity,
+    )
+
+def test_title_score_prefers_closer_titles():
+    assert title_score("The Matrix", "matrix") == 1.0
+    assert title_score("The Matrix", "matrix") > title_score("The Matrix Reloaded", "matrix")
+    assert title_score("The Matrix Reloaded", "matrix") > title_score("The Animatrix", "matrix")
+
+def test_relevance_weighs_actors_and_genre():
+    query = SearchQuery.normalize(title="Matrix", actors=["Keanu Reeves", "Carrie-Anne Moss"], genre="Action")
+    both = make_movie("The Matrix", actors=["Keanu Reeves", "Carrie-Anne Moss"])
+    one = make_movie("The Matrix", actors=["Keanu Reeves"])
+    other_genre = make_movie("The Matrix", actors=["Keanu Reeves"], genre=["Drama"])
+
+    assert relevance(both, query) > relevance(one, query) > relevance(other_genre, query)
+
+def test_popularity_only_breaks_near_ties():
+    query = SearchQuery.normalize(title="Matrix")
+    exact = make_movie("The Matrix", popularity=1)
+    popular = make_movie("The Matrix Resurrections", popularity=100000)
+
+    assert relevance(exact, query) > relevance(popular, query)
+    assert relevance(make_movie("The Matrix", popularity=80), query) > relevance(exact, query)
+
+def test_top_movies_selects_in_sort_order():
+    movies = [make_movie("The Matrix Reloaded", year="2003"), make_movie("Animatrix", year="2003"),
+              make_movie("The Matrix", year="1999"), make_movie("Matrix Revolutions", year="2003")]
+    query = SearchQuery.normalize(title="Matrix")
+
+    assert [m.title for m in top_movies(movies, query, "relevance", 2)] == ["The Matrix", "The Matrix Reloaded"]
+    # Ties keep their merge order
+    assert [m.title for m in top_movies(movies, query, "year", 2)] == ["The Matrix Reloaded", "Animatrix"]
+    assert [m.title for m in top_movies(movies, query, "title", 4)] == \
+        ["Animatrix", "The Matrix", "The Matrix Reloaded", "Matrix Revolutions"]
+
+def test_rank_candidates_uses_hits_until_enriched():
+    candidates = [
+        ("omdb", MovieHit(id="1", title="The Matrix Reloaded", year="2003"), None),
+        ("tmdb", MovieHit(id="2", title="Matrix"), make_movie("The Matrix", year="1999")),
+        ("omdb", MovieHit(id="3", title="Matrix Uprising", year="2008–2013"), None),
+        ("tmdb", MovieHit(id="4"), None),
+    ]
+
+    assert [hit.id for _, hit, _ in ranked_candidates(candidates, "year")] == ["3", "1", "2", "4"]
+    assert [hit.id for _, hit, _ in ranked_candidates(candidates, "title")] == ["2", "1", "3", "4"]
@@ -0,0 +1,133 @@
+from starlette.requests import Request
+from app.config import RateLimitTier, get_settings
+from app.middleware.rate_limit import RateLimiter, SharedRateLimits
+
+def make_limiter(per_minute=60, burst=3, **settings):
+    settings.update({"RATE_LIMIT_PER_MINUTE": per_minute, "RATE_LIMIT_BURST": burst})
+    return RateLimiter(get_settings().copy(update=settings))
+
+def make_request(host="203.0.113.7", headers=None):
+    return Request({
+        "type": "http",
+        "client": (host, 1234),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    })
+
+def test_burst_then_sustained_rate():
+    limiter = make_limiter()
+    decisions = [limiter.acquire("client", 100.0) for _ in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[3].retry_after == 1.0
+
+    # One request per second is sustained
+    assert limiter.acquire("client", 101.0).allowed
+    assert not limiter.acquire("client", 101.5).allowed
+    assert limiter.acquire("client", 102.0).allowed
+
+def test_no_double_burst_at_window_edges():
+    limiter = make_limiter(per_minute=60, burst=60)
+    allowed = sum(limiter.acquire("client", 59.9).allowed for _ in range(60))
+    allowed += sum(limiter.acquire("client", 60.1).allowed for _ in range(60))
+
+    # A fixed window would let 120 through here
+    assert allowed == 60
+
+def test_clients_are_limited_independently():
+    limiter = make_limiter(burst=1)
+    assert limiter.acquire("a", 0.0).allowed
+    assert not limiter.acquire("a", 0.0).allowed
+    assert limiter.acquire("b", 0.0).allowed
+
+def test_headers():
+    limiter = make_limiter(burst=2)
+    limiter.acquire("client", 0.0)
+    limiter.acquire("client", 0.0)
+    rejected = limiter.acquire("client", 0.5)
+
+    headers = limiter.headers(rejected)
+    assert headers["RateLimit-Limit"] == "2"
+    assert headers["RateLimit-Remaining"] == "0"
+    assert headers["RateLimit-Reset"] == "2"
+    assert headers["Retry-After"] == "1"
+
+def test_expired_clients_are_evicted_incrementally():
+    limiter = make_limiter(per_minute=60, burst=1)
+    for i in range(40):
+        limiter.acquire(f"client {i}", 0.0)
+    assert len(limiter.clients) == 40
+
+    # Each request evicts a bounded batch of expired clients
+    limiter.acquire("late", 5.0)
+    assert len(limiter.clients) == 40 - 16 + 1
+    limiter.acquire("late", 7.0)
+    limiter.acquire("late", 9.0)
+    assert list(limiter.clients) == ["late"]
+
+def test_tracked_clients_are_capped():
+    limiter = make_limiter(RATE_LIMIT_MAX_CLIENTS=2)
+    limiter.acquire("a", 0.0)
+    limiter.acquire("b", 0.0)
+    limiter.acquire("a", 0.0)
+    limiter.acquire("c", 0.0)
+
+    assert list(limiter.clients) == ["a", "c"]
+
+def test_shared_limits_apply_across_limiters(tmp_path):
+    path = str(tmp_path / "rate-limit")
+    first, second = make_limiter(), make_limiter()
+    first.shared = SharedRateLimits(path, 100)
+    second.shared = SharedRateLimits(path, 100)
+
+    decisions = [limiter.acquire("client", 100.0) for limiter in (first, second, first, second)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[2].remaining == 0
+    assert second.acquire("other", 100.0).allowed
+
+def test_shared_limits_reuse_idle_slots(tmp_path):
+    limiter = make_limiter(burst=1)
+    limiter.shared = SharedRateLimits(str(tmp_path / "rate-limit"), 8)
+    for i in range(20):
+        assert limiter.acquire(f"client {i}", float(i)).allowed
+
+    assert not limiter.acquire("client 19", 19.5).allowed
+
+def test_forwarded_for_is_only_trusted_from_proxies():
+    limiter = make_limiter(RATE_LIMIT_TRUSTED_PROXIES=["10.0.0.0/8"])
+    forwarded = {"X-Forwarded-For": "198.51.100.1, 192.0.2.9, 10.0.0.5"}
+
+    # The first hop left of the trusted proxies is the client; the rest could be forged
+    assert limiter.client_ip(make_request("10.0.0.2", forwarded)) == "192.0.2.9"
+    assert limiter.client_ip(make_request("203.0.113.7", forwarded)) == "203.0.113.7"
+    assert limiter.client_ip(make_request("10.0.0.2")) == "10.0.0.2"
+
+def test_known_api_keys_get_their_tier():
+    limiter = make_limiter(
+        RATE_LIMIT_KEY="api_key",
+        RATE_LIMIT_TIERS={"partner": RateLimitTier(per_minute=600, burst=50)},
+        RATE_LIMIT_API_KEYS={"secret": "partner"},
+    )
+
+    key, tier = limiter.identify(make_request(headers={"X-API-Key": "secret"}))
+    assert key == "key:secret"
+    assert tier.burst == 50
+    assert limiter.headers(limiter.acquire(key, 0.0, tier), tier)["RateLimit-Policy"] == "50;w=5"
+
+    # Unknown keys are limited by IP under the default limits
+    key, tier = limiter.identify(make_request(headers={"X-API-Key": "made-up"}))
+    assert (key, tier) == ("203.0.113.7", limiter.default_tier)
+
+def test_api_key_and_ip_limits_each_address_of_a_key():
+    limiter = make_limiter(
+        RATE_LIMIT_KEY="api_key_and_ip",
+        RATE_LIMIT_TIERS={"partner": RateLimitTier(per_minute=60, burst=1)},
+        RATE_LIMIT_API_KEYS={"secret": "partner"},
+    )
+    first, tier = limiter.identify(make_request("192.0.2.1", {"X-API-Key": "secret"}))
+    second, _ = limiter.identify(make_request("192.0.2.2", {"X-API-Key": "secret"}))
+
+    assert limiter.acquire(first, 0.0, tier).allowed
+    assert not limiter.acquire(first, 0.0, tier).allowed
+    assert limiter.acquire(second, 0.0, tier).allowed
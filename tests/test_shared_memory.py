@@ -0,0 +1,70 @@
+import multiprocessing
+import pytest
+import struct
+from app.services import shared_memory
+from app.services.shared_memory import DIGEST_SIZE, SharedTable
+
+COUNTER = struct.Struct(f"<{DIGEST_SIZE}sQ")
+
+def increment(path, times):
+    table = SharedTable(path, 8, COUNTER.size)
+    digest = table.digest("counter")
+    for _ in range(times):
+        with table.locked(table.bucket_of(digest)) as offsets:
+            _, count = COUNTER.unpack_from(table.buf, offsets[0])
+            COUNTER.pack_into(table.buf, offsets[0], digest, count + 1)
+    table.close()
+
+def test_tables_on_one_path_share_slots(tmp_path):
+    path = str(tmp_path / "shared")
+    first = SharedTable(path, 16, 32)
+    second = SharedTable(path, 16, 32)
+    digest = first.digest("key")
+    with first.locked(first.bucket_of(digest)) as offsets:
+        first.buf[offsets[0]:offsets[0] + DIGEST_SIZE] = digest
+
+    with second.locked(second.bucket_of(digest)) as offsets:
+        assert second.buf[offsets[0]:offsets[0] + DIGEST_SIZE] == digest
+
+def test_file_laid_out_for_other_settings_is_refused(tmp_path):
+    path = str(tmp_path / "shared")
+    table = SharedTable(path, 16, 32)
+    table.buf[-1] = 1
+
+    with pytest.raises(RuntimeError):
+        SharedTable(path, 16, 64)
+    # The file is left alone for the workers still mapping it
+    assert table.buf[-1] == 1
+    table.close()
+
+def test_slots_from_an_earlier_boot_are_cleared(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared")
+    table = SharedTable(path, 16, 32)
+    table.buf[-1] = 1
+    table.close()
+
+    boot_id = tmp_path / "boot_id"
+    boot_id.write_text("0b7a5cfe-0c8e-4f4a-9d1e-6a3b1c2d4e5f\n")
+    monkeypatch.setattr(shared_memory, "BOOT_ID_PATH", str(boot_id))
+    table = SharedTable(path, 16, 32)
+    assert not any(table.buf[64:])
+    table.buf[-1] = 1
+    table.close()
+
+    # Reopening within the same boot keeps the slots
+    table = SharedTable(path, 16, 32)
+    assert table.buf[-1] == 1
+    table.close()
+
+def test_bucket_locks_exclude_other_processes(tmp_path):
+    path = str(tmp_path / "shared")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=increment, args=(path, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    table = SharedTable(path, 8, COUNTER.size)
+    with table.locked(table.bucket_of(table.digest("counter"))) as offsets:
+        assert COUNTER.unpack_from(table.buf, offsets[0])[1] == 800